@@ -0,0 +1,122 @@
+import hashlib
+import json
+import logging
+import time
+import zlib
+
+from .metrics import metrics
+
+
+logger = logging.getLogger(__name__)
+
+cache_requests = metrics.counter(
+    "http_cache_requests_total", "Response cache lookups by cache and result."
+)
+
+
+# Tag of the stored bodies, by type of the cached response. Nothing is
+# unpickled, so whoever can write to Redis cannot run code through the cache.
+JSON_TAG, TEXT_TAG, BYTES_TAG = b"j", b"t", b"b"
+
+
+def dump_body(value) -> bytes:
+    """Serialize a response body: text, bytes, or JSON-decoded data."""
+    if isinstance(value, str):
+        return TEXT_TAG + value.encode("utf-8")
+    if isinstance(value, bytes):
+        return BYTES_TAG + value
+    return JSON_TAG + json.dumps(value).encode("utf-8")
+
+
+def load_body(data: bytes):
+    """Deserialize a response body written by dump_body.
+
+    Raises:
+        ValueError: If the data was not written by dump_body.
+    """
+    tag, payload = data[:1], data[1:]
+    if tag == TEXT_TAG:
+        return payload.decode("utf-8")
+    if tag == BYTES_TAG:
+        return payload
+    if tag == JSON_TAG:
+        return json.loads(payload)
+    raise ValueError(f"Unknown cached body tag {tag!r}")
+
+
+class ResponseCache:
+    """Redis cache for HTTP response bodies with per-entry TTL and LRU eviction.
+
+    Bodies are stored compressed under their own key with a TTL. A sorted set
+    scored by last access time tracks every entry, and the least recently used
+    entries are evicted once more than `max_entries` are stored. Hits and misses
+    are counted in a Redis hash so they add up across processes.
+
+    Args:
+        client (Redis): Redis client used to store the cache
+        prefix (str): Prefix of every Redis key written by the cache (optional)
+        max_entries (int): Maximum number of cached responses (optional)
+    """
+
+    def __init__(self, client, prefix: str = "httpcache", max_entries: int = 10000):
+        self.client = client
+        self.prefix = prefix
+        self.max_entries = max_entries
+        self.index_key = f"{prefix}:index"
+        self.stats_key = f"{prefix}:stats"
+
+    def make_key(self, method: str, url: str, params: dict = None) -> str:
+        """Build the cache key of a request from its method, URL and parameters."""
+        fingerprint = json.dumps(
+            [method.upper(), url, sorted((params or {}).items())], default=str
+        )
+        return hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()
+
+    def _body_key(self, key: str) -> str:
+        return f"{self.prefix}:body:{key}"
+
+    def get(self, key: str):
+        """Return the cached response or None, and record a hit or a miss."""
+        body = self.client.get(self._body_key(key))
+        if body is not None:
+            try:
+                value = load_body(zlib.decompress(body))
+            except (zlib.error, ValueError, UnicodeDecodeError):
+                # Written by an older version or by something else, refetch it
+                logger.warning(f"Ignoring unreadable cached response {key}")
+                body = None
+        pipe = self.client.pipeline(transaction=False)
+        if body is None:
+            pipe.zrem(self.index_key, key)
+            pipe.hincrby(self.stats_key, "misses", 1)
+            pipe.execute()
+            cache_requests.inc(cache=self.prefix, result="miss")
+            return None
+        pipe.zadd(self.index_key, {key: time.time()})
+        pipe.hincrby(self.stats_key, "hits", 1)
+        pipe.execute()
+        cache_requests.inc(cache=self.prefix, result="hit")
+        return value
+
+    def set(self, key: str, value, ttl: int):
+        """Cache a response for `ttl` seconds, evicting the least recently used entries."""
+        pipe = self.client.pipeline(transaction=False)
+        pipe.set(self._body_key(key), zlib.compress(dump_body(value)), ex=ttl)
+        pipe.zadd(self.index_key, {key: time.time()})
+        pipe.zcard(self.index_key)
+        size = pipe.execute()[-1]
+        if size > self.max_entries:
+            evicted = self.client.zpopmin(self.index_key, size - self.max_entries)
+            self.client.delete(
+                *(self._body_key(member.decode()) for member, _ in evicted)
+            )
+            logger.debug(f"Evicted {len(evicted)} responses from {self.prefix}")
+
+    def stats(self) -> dict:
+        """Return the hit and miss counters and the number of cached entries."""
+        counters = self.client.hgetall(self.stats_key)
+        return {
+            "hits": int(counters.get(b"hits", 0)),
+            "misses": int(counters.get(b"misses", 0)),
+            "entries": self.client.zcard(self.index_key),
+        }
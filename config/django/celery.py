@@ -9,3 +9,60 @@ app = Celery("echo_chamber")
 
 app.config_from_object("django.conf:settings", namespace="CELERY")
 app.autodiscover_tasks()
+
+# Network-bound tasks and database-bound tasks go to their own queues so that
+# slow fetches never hold the workers that store results.
+FETCH_QUEUE = "fetch"
+PERSIST_QUEUE = "persist"
+
+# Every task a worker consumes has to land on one of these two queues, the
+# default one included, or its messages wait forever
+app.conf.task_default_queue = PERSIST_QUEUE
+app.conf.task_routes = {
+    "crawler.tasks.google_search_task": {"queue": FETCH_QUEUE},
+    "crawler.tasks.google_search_page_task": {"queue": FETCH_QUEUE},
+    "crawler.tasks.start_crawl_task": {"queue": PERSIST_QUEUE},
+    "crawler.tasks.process_search_results_task": {"queue": PERSIST_QUEUE},
+    "crawler.tasks.persist_search_page_task": {"queue": PERSIST_QUEUE},
+    "crawler.tasks.finalize_search_task": {"queue": PERSIST_QUEUE},
+    "crawler.tasks.fail_crawl_task": {"queue": PERSIST_QUEUE},
+    "crawler.tasks.schedule_recrawls_task": {"queue": PERSIST_QUEUE},
+    "crawler.tasks.recrawl_task": {"queue": PERSIST_QUEUE},
+    "crawler.tasks.record_recrawl_task": {"queue": PERSIST_QUEUE},
+    # Built-in tasks, e.g. celery.starmap sent by .chunks() or celery.chord_unlock
+    "celery.*": {"queue": PERSIST_QUEUE},
+}
+
+# Run by the `celery beat` process, re-crawls are enqueued when their
+# per-config interval has elapsed.
+app.conf.beat_schedule = {
+    "schedule-recrawls": {
+        "task": "crawler.tasks.schedule_recrawls_task",
+        "schedule": float(os.getenv("CRAWLER_RECRAWL_POLL_INTERVAL", 60)),
+    },
+}
+
+# Pool settings of the worker started with CELERY_WORKER_PROFILE set to a key
+# of this dict, e.g. `CELERY_WORKER_PROFILE=fetch celery -A ... worker -Q fetch`.
+# Fetches spend their time waiting on sockets, so they run in threads. Parsing
+# and archiving the fetched pages hold the GIL though, so fetch capacity comes
+# from several worker processes of a few dozen threads each rather than from
+# one process with hundreds of threads. Inserts stay in a few prefork
+# processes, to bound the number of database connections.
+WORKER_PROFILES = {
+    FETCH_QUEUE: {
+        "worker_pool": "threads",
+        "worker_concurrency": int(os.getenv("CELERY_FETCH_CONCURRENCY", 50)),
+        "worker_prefetch_multiplier": 1,
+    },
+    PERSIST_QUEUE: {
+        "worker_pool": "prefork",
+        "worker_concurrency": int(os.getenv("CELERY_PERSIST_CONCURRENCY", 4)),
+        "worker_prefetch_multiplier": 4,
+        "worker_max_tasks_per_child": 1000,
+    },
+}
+
+worker_profile = os.getenv("CELERY_WORKER_PROFILE")
+if worker_profile:
+    app.conf.update(WORKER_PROFILES[worker_profile])
@@ -0,0 +1,74 @@
+import logging
+import uuid
+import zlib
+
+import msgpack
+
+
+logger = logging.getLogger(__name__)
+
+REFERENCE_KEY = "__claim_check__"
+
+
+class ClaimCheckExpired(Exception):
+    """Raised when a referenced payload is no longer in the store."""
+
+
+class ClaimCheckStore:
+    """Keep large task payloads out of broker messages and task results.
+
+    Payloads bigger than `threshold` bytes once packed with msgpack are stored
+    compressed in Redis, and only a small reference travels through Celery.
+    Smaller payloads are passed through unchanged, so `get` accepts both.
+
+    Args:
+        client (Redis): Redis client used to store the payloads
+        ttl (int): Seconds a stored payload is kept
+        threshold (int): Packed size in bytes above which payloads are stored
+        prefix (str): Prefix of the Redis keys (optional)
+    """
+
+    def __init__(self, client, ttl: int, threshold: int, prefix: str = "claimcheck"):
+        self.client = client
+        self.ttl = ttl
+        self.threshold = threshold
+        self.prefix = prefix
+
+    @staticmethod
+    def is_reference(value) -> bool:
+        return isinstance(value, dict) and REFERENCE_KEY in value
+
+    def put(self, value):
+        """Store a payload if it is large and return what should be sent instead.
+
+        Args:
+            value: msgpack serializable payload
+
+        Returns:
+            The payload itself when small, otherwise a reference to it.
+        """
+        packed = msgpack.packb(value)
+        if len(packed) <= self.threshold:
+            return value
+        key = f"{self.prefix}:{uuid.uuid4().hex}"
+        self.client.set(key, zlib.compress(packed), ex=self.ttl)
+        return {REFERENCE_KEY: key}
+
+    def get(self, value):
+        """Return the payload a value refers to, or the value if it is not a reference.
+
+        Raises:
+            ClaimCheckExpired: If the referenced payload expired or was discarded.
+        """
+        if not self.is_reference(value):
+            return value
+        data = self.client.get(value[REFERENCE_KEY])
+        if data is None:
+            raise ClaimCheckExpired(f"Payload {value[REFERENCE_KEY]} is gone")
+        return msgpack.unpackb(zlib.decompress(data))
+
+    def discard(self, *values):
+        """Delete the payloads of references once they were consumed."""
+        keys = [value[REFERENCE_KEY] for value in values if self.is_reference(value)]
+        if keys:
+            self.client.delete(*keys)
@@ -1,4 +1,12 @@
+import hashlib
 import logging
+import mmap
+import os
+import socket
+import struct
+import threading
+import time
+import zlib
 from pathlib import Path
 
 
@@ -37,3 +45,175 @@ def delete_files_in_directory(path: Path):
         if file.is_file():
             file.unlink()
             logger.debug(f"Deleted: {file}")
+
+
+class ArchiveCorrupted(Exception):
+    """Raised when an archive record does not match what its index entry expects."""
+
+
+class SegmentArchive:
+    """
+    Append-only archive of compressed documents spread over segment files.
+
+    Each process appends to its own segment, so writers never need a lock
+    between processes, and rolls over to a new one once `segment_size` bytes
+    are written. A record is a header (magic, SHA-256 of the raw document,
+    compressed length) followed by the zlib compressed document. Batches are
+    written with a single write and fsync'ed before their locations are
+    returned, so an index built from those locations never points at a
+    partial record. Segments are memory-mapped for reading.
+
+    Parameters:
+        root (Path): Directory holding the segment files.
+        segment_size (int): Size in bytes after which a new segment is started.
+        compression_level (int): zlib compression level.
+    """
+
+    MAGIC = b"SRP1"
+    HEADER = struct.Struct(">4s32sI")
+    SUFFIX = ".seg"
+
+    def __init__(
+        self,
+        root: Path,
+        segment_size: int = 256 * 1024**2,
+        compression_level: int = 6,
+    ):
+        self.root = Path(root)
+        self.segment_size = segment_size
+        self.compression_level = compression_level
+        self._lock = threading.Lock()
+        self._pid = None
+        self._segment = None
+        self._sequence = 0
+        self._maps = {}
+
+    @staticmethod
+    def content_hash(document: bytes) -> str:
+        return hashlib.sha256(document).hexdigest()
+
+    def _current_segment(self) -> Path:
+        if self._pid != os.getpid():
+            # Never share a segment with the process this one was forked from
+            self._pid = os.getpid()
+            self._segment = None
+        if self._segment is None or (
+            self._segment.exists() and self._segment.stat().st_size >= self.segment_size
+        ):
+            self._sequence += 1
+            name = (
+                f"{socket.gethostname()}-{self._pid}-{time.time_ns()}-{self._sequence}"
+            )
+            self._segment = self.root / f"{name}{self.SUFFIX}"
+        return self._segment
+
+    def append(self, documents: list) -> list:
+        """
+        Compress and append a batch of documents in a single durable write.
+
+        Parameters:
+            documents (list): Raw documents as bytes.
+
+        Returns:
+            list: (content hash, segment name, offset, length) of every document,
+            where offset is the position of the record and length the size of
+            its compressed payload.
+        """
+        if not documents:
+            return []
+        self.root.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            segment = self._current_segment()
+            with segment.open("ab") as file:
+                offset = file.tell()
+                records = []
+                locations = []
+                for document in documents:
+                    digest = hashlib.sha256(document).digest()
+                    payload = zlib.compress(document, self.compression_level)
+                    records.append(self.HEADER.pack(self.MAGIC, digest, len(payload)))
+                    records.append(payload)
+                    locations.append((digest.hex(), segment.name, offset, len(payload)))
+                    offset += self.HEADER.size + len(payload)
+                file.write(b"".join(records))
+                file.flush()
+                os.fsync(file.fileno())
+        return locations
+
+    def _map(self, segment: str, end: int) -> mmap.mmap:
+        mapped = self._maps.get(segment)
+        if mapped is None or len(mapped) < end:
+            # Not mapped yet, or mapped before the segment grew
+            if mapped is not None:
+                mapped.close()
+            with (self.root / segment).open("rb") as file:
+                mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[segment] = mapped
+        return mapped
+
+    def read(
+        self, segment: str, offset: int, length: int, verify: bool = True
+    ) -> bytes:
+        """
+        Return the raw document stored at a location returned by `append`.
+
+        Parameters:
+            segment (str): Name of the segment file.
+            offset (int): Position of the record in the segment.
+            length (int): Size of the compressed payload.
+            verify (bool): Check the document against its content hash.
+
+        Raises:
+            ArchiveCorrupted: If the record header or content hash do not match.
+        """
+        end = offset + self.HEADER.size + length
+        mapped = self._map(segment, end)
+        magic, digest, stored_length = self.HEADER.unpack_from(mapped, offset)
+        if magic != self.MAGIC or stored_length != length:
+            raise ArchiveCorrupted(f"No record of {length} bytes at {segment}:{offset}")
+        document = zlib.decompress(mapped[offset + self.HEADER.size : end])
+        if verify and hashlib.sha256(document).digest() != digest:
+            raise ArchiveCorrupted(f"Content hash mismatch at {segment}:{offset}")
+        return document
+
+    def scan(self, segment: str):
+        """
+        Yield (content hash, offset, document) for every complete record of a segment.
+
+        A record cut short by a crash ends the scan.
+
+        Parameters:
+            segment (str): Name of the segment file.
+        """
+        size = (self.root / segment).stat().st_size
+        if not size:
+            return
+        mapped = self._map(segment, size)
+        offset = 0
+        while offset + self.HEADER.size <= size:
+            magic, digest, length = self.HEADER.unpack_from(mapped, offset)
+            end = offset + self.HEADER.size + length
+            if magic != self.MAGIC or end > size:
+                logger.warning(
+                    f"Stopped reading {segment} at a partial record {offset}"
+                )
+                return
+            yield digest.hex(), offset, zlib.decompress(
+                mapped[offset + self.HEADER.size : end]
+            )
+            offset = end
+
+    def segments(self) -> list:
+        """Return the names of every segment of the archive, oldest first."""
+        if not self.root.exists():
+            return []
+        return sorted(
+            (path.name for path in self.root.glob(f"*{self.SUFFIX}")),
+            key=lambda name: (self.root / name).stat().st_mtime,
+        )
+
+    def close(self):
+        """Unmap every segment mapped by `read` or `scan`."""
+        for mapped in self._maps.values():
+            mapped.close()
+        self._maps = {}
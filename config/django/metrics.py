@@ -0,0 +1,196 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from django.conf import settings
+
+from .redis_client import get_redis_client
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _label_string(labels: dict) -> str:
+    return ",".join(f'{key}="{value}"' for key, value in sorted(labels.items()))
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metric:
+    """Base class of the metrics declared on a MetricsRegistry."""
+
+    type = None
+
+    def __init__(self, registry, name: str, documentation: str):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+
+    def render(self, fields: dict) -> list:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """Monotonically increasing value, e.g. a number of requests or bytes."""
+
+    type = "counter"
+
+    def inc(self, value: float = 1, **labels):
+        self.registry.record(self.name, {_label_string(labels): value})
+
+    def render(self, fields: dict) -> list:
+        lines = []
+        for labels, value in sorted(fields.items()):
+            suffix = f"{{{labels}}}" if labels else ""
+            lines.append(f"{self.name}{suffix} {_format_value(value)}")
+        return lines
+
+
+class Histogram(Metric):
+    """Distribution of observed values, e.g. latencies or sizes.
+
+    Buckets are stored cumulatively, as Prometheus exposes them.
+    """
+
+    type = "histogram"
+
+    def __init__(
+        self, registry, name: str, documentation: str, buckets=DEFAULT_BUCKETS
+    ):
+        super().__init__(registry, name, documentation)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        label_string = _label_string(labels)
+        updates = {
+            f"{label_string}\x1f{bound}": 1 for bound in self.buckets if value <= bound
+        }
+        updates[f"{label_string}\x1f+Inf"] = 1
+        updates[f"{label_string}\x1fsum"] = value
+        self.registry.record(self.name, updates)
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the seconds spent in the block."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self, fields: dict) -> list:
+        series = {}
+        for field, value in fields.items():
+            labels, _, bound = field.rpartition("\x1f")
+            series.setdefault(labels, {})[bound] = value
+
+        lines = []
+        for labels, values in sorted(series.items()):
+            prefix = f"{labels}," if labels else ""
+            for bound in (*map(str, self.buckets), "+Inf"):
+                lines.append(
+                    f'{self.name}_bucket{{{prefix}le="{bound}"}} '
+                    f"{_format_value(values.get(bound, 0))}"
+                )
+            suffix = f"{{{labels}}}" if labels else ""
+            lines.append(
+                f"{self.name}_sum{suffix} {_format_value(values.get('sum', 0))}"
+            )
+            lines.append(
+                f"{self.name}_count{suffix} {_format_value(values.get('+Inf', 0))}"
+            )
+        return lines
+
+
+class MetricsRegistry:
+    """Process-local metric aggregation flushed to Redis.
+
+    Observations are only added to an in-memory table on the hot path. The
+    table is pushed to Redis with HINCRBYFLOAT at most every `flush_interval`
+    seconds (and whenever `flush` is called, e.g. after each Celery task), so
+    every web and worker process adds up to the same totals. Rendering reads
+    those totals back in the Prometheus text format.
+
+    Args:
+        prefix (str): Prefix of the Redis hashes holding the metrics (optional)
+        flush_interval (float): Maximum seconds between two flushes (optional)
+    """
+
+    def __init__(self, prefix: str = "metrics", flush_interval: float = None):
+        self.prefix = prefix
+        self.flush_interval = flush_interval
+        self.metrics = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._last_flush = time.monotonic()
+
+    def counter(self, name: str, documentation: str) -> Counter:
+        return self._declare(Counter(self, name, documentation))
+
+    def histogram(
+        self, name: str, documentation: str, buckets=DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._declare(Histogram(self, name, documentation, buckets))
+
+    def _declare(self, metric: Metric) -> Metric:
+        return self.metrics.setdefault(metric.name, metric)
+
+    def record(self, name: str, updates: dict):
+        """Add values to fields of a metric, fields are metric specific."""
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked child, what is pending belongs to the parent
+                self._pid = os.getpid()
+                self._pending = {}
+            for field, value in updates.items():
+                key = (name, field)
+                self._pending[key] = self._pending.get(key, 0) + value
+        interval = (
+            settings.METRICS_FLUSH_INTERVAL
+            if self.flush_interval is None
+            else self.flush_interval
+        )
+        if time.monotonic() - self._last_flush >= interval:
+            self.flush()
+
+    def flush(self):
+        """Push the pending observations of this process to Redis."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+        if not pending:
+            return
+        try:
+            pipe = get_redis_client().pipeline(transaction=False)
+            for (name, field), value in pending.items():
+                pipe.hincrbyfloat(f"{self.prefix}:{name}", field, value)
+            pipe.execute()
+        except Exception as exc:
+            logger.warning(f"Dropped {len(pending)} metric updates: {exc}")
+
+    def render(self) -> str:
+        """Return every declared metric, summed across processes, as Prometheus text."""
+        self.flush()
+        client = get_redis_client()
+        pipe = client.pipeline(transaction=False)
+        for name in self.metrics:
+            pipe.hgetall(f"{self.prefix}:{name}")
+        lines = []
+        for metric, fields in zip(self.metrics.values(), pipe.execute()):
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(
+                metric.render(
+                    {field.decode(): float(value) for field, value in fields.items()}
+                )
+            )
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
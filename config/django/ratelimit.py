@@ -0,0 +1,139 @@
+import hashlib
+import logging
+import random
+
+from .metrics import metrics
+
+
+logger = logging.getLogger(__name__)
+
+ratelimit_acquires = metrics.counter(
+    "ratelimit_acquire_total", "Token bucket acquisitions by result."
+)
+ratelimit_wait = metrics.histogram(
+    "ratelimit_wait_seconds",
+    "Seconds callers were told to wait for a token when the bucket was empty.",
+    buckets=(0.5, 1, 2, 5, 10, 30, 60, 120, 300),
+)
+
+# Refill and take from the bucket atomically. Redis' own clock is used so that
+# workers on different hosts agree on elapsed time. Returns the number of
+# seconds until enough tokens are available, or 0 when the tokens were taken.
+TOKEN_BUCKET_SCRIPT = """
+local key = KEYS[1]
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+
+local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+local wait = 0
+if tokens >= requested then
+    tokens = tokens - requested
+else
+    wait = (requested - tokens) / rate
+end
+
+redis.call('HSET', key, 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', key, math.ceil(capacity / rate) + 60)
+return tostring(wait)
+"""
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a rate limited operation has to be retried later.
+
+    Args:
+        retry_after (float): Seconds to wait before trying again
+    """
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Rate limit exceeded, retry after {retry_after:.2f}s")
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Token bucket rate limiter whose state lives in Redis.
+
+    Every process that builds a bucket with the same key shares one budget, so
+    any number of Celery workers can draw from a single request allowance.
+
+    Args:
+        client (Redis): Redis client used to store the bucket
+        key (str): Redis key of the bucket
+        rate (float): Number of tokens added per second
+        capacity (int): Maximum number of tokens the bucket can hold
+        jitter (float): Upper bound of random seconds added to retry delays (optional)
+    """
+
+    def __init__(
+        self,
+        client,
+        key: str,
+        rate: float,
+        capacity: int,
+        jitter: float = 1.0,
+    ):
+        self.client = client
+        self.key = key
+        self.rate = rate
+        self.capacity = capacity
+        self.jitter = jitter
+        self._script = client.register_script(TOKEN_BUCKET_SCRIPT)
+
+    @classmethod
+    def for_egress(cls, client, proxy: str = None, **kwargs):
+        """Build the bucket shared by every request leaving through the same egress.
+
+        Proxy URLs are hashed so that credentials never end up in Redis keys.
+
+        Args:
+            client (Redis): Redis client used to store the bucket
+            proxy (str): Proxy URL, None for direct connections (optional)
+            **kwargs: Remaining TokenBucket arguments
+
+        Returns:
+            TokenBucket: Bucket keyed by egress identity.
+        """
+        egress = hashlib.sha1(proxy.encode("utf-8")).hexdigest() if proxy else "direct"
+        return cls(client, f"ratelimit:google:{egress}", **kwargs)
+
+    def acquire(self, tokens: int = 1) -> float:
+        """Try to take tokens from the bucket without blocking.
+
+        Args:
+            tokens (int): Number of tokens to take (optional)
+
+        Returns:
+            float: 0 when the tokens were taken, otherwise seconds to wait before retrying.
+        """
+        wait = float(
+            self._script(keys=[self.key], args=[self.rate, self.capacity, tokens])
+        )
+        if wait:
+            wait += random.uniform(0, self.jitter)
+            logger.debug(f"Rate limited on {self.key}, retry in {wait:.2f}s")
+            ratelimit_acquires.inc(result="limited")
+            ratelimit_wait.observe(wait)
+        else:
+            ratelimit_acquires.inc(result="acquired")
+        return wait
+
+    def consume(self, tokens: int = 1):
+        """Take tokens from the bucket or raise.
+
+        Args:
+            tokens (int): Number of tokens to take (optional)
+
+        Raises:
+            RateLimitExceeded: If the bucket does not hold enough tokens.
+        """
+        wait = self.acquire(tokens)
+        if wait:
+            raise RateLimitExceeded(wait)
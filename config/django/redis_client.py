@@ -0,0 +1,20 @@
+import redis
+from functools import lru_cache
+from django.conf import settings
+
+
+@lru_cache(maxsize=None)
+def get_redis_client(url: str = None) -> redis.Redis:
+    """Return a process-wide Redis client for the given URL.
+
+    Clients are cached per URL so that every caller in a process shares one
+    connection pool. redis-py resets the pool on fork, so this is safe to use
+    from Celery prefork workers.
+
+    Args:
+        url (str): Redis connection URL, defaults to settings.REDIS_URL (optional)
+
+    Returns:
+        Redis: Redis client bound to a shared connection pool.
+    """
+    return redis.Redis.from_url(url or settings.REDIS_URL)
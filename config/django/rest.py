@@ -1,5 +1,106 @@
+import os
 import requests
 import logging
+import threading
+import time
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .metrics import metrics
+
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+http_request_duration = metrics.histogram(
+    "http_client_request_duration_seconds",
+    "Latency of outgoing HTTP requests, retries included, by method and status.",
+)
+http_response_bytes = metrics.counter(
+    "http_client_response_bytes_total", "Bytes downloaded by outgoing HTTP requests."
+)
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+class BackoffRetry(Retry):
+    """Retry policy whose Retry-After waits are capped at `backoff_max`."""
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, self.backoff_max)
+
+
+def build_session(
+    pool_connections: int = 10,
+    pool_maxsize: int = 10,
+    max_retries: int = 0,
+    backoff_factor: float = 0.5,
+    backoff_max: float = 60,
+) -> requests.Session:
+    """Create a session with a sized connection pool and a retry policy.
+
+    Failed requests and 429/5xx responses are retried with exponential backoff
+    and jitter. A Retry-After header on 429/503 responses is honoured, up to
+    `backoff_max` seconds.
+
+    Args:
+        pool_connections (int): Number of host connection pools to cache (optional)
+        pool_maxsize (int): Maximum number of kept-alive connections per host (optional)
+        max_retries (int): Number of retries per request, 0 disables retrying (optional)
+        backoff_factor (float): Base of the exponential backoff in seconds (optional)
+        backoff_max (float): Maximum seconds to wait between two attempts (optional)
+
+    Returns:
+        Session: Configured requests session.
+    """
+    retry = BackoffRetry(
+        total=max_retries,
+        status_forcelist=RETRY_STATUS_CODES if max_retries else None,
+        backoff_factor=backoff_factor,
+        backoff_max=backoff_max,
+        backoff_jitter=backoff_factor,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_shared_session(
+    profile: str, proxies: dict = None, **kwargs
+) -> requests.Session:
+    """Return the session of this process for a header profile and proxy.
+
+    Sessions are built once per process and reused by every RestAdapter asking
+    for the same profile and proxy, so TLS handshakes and kept-alive
+    connections outlive a single adapter. The process id is part of the key so
+    a forked worker never reuses its parent's sockets.
+
+    Args:
+        profile (str): Name of the header profile the session is used for
+        proxies (dict): Dictionary of proxy addresses for HTTP(s) (optional)
+        **kwargs: Pool and retry arguments passed to build_session
+
+    Returns:
+        Session: Session shared within the current process.
+    """
+    key = (os.getpid(), profile, tuple(sorted((proxies or {}).items())))
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = build_session(**kwargs)
+            if proxies:
+                session.proxies.update(proxies)
+            _sessions[key] = session
+        return session
 
 
 class RestAdapter:
@@ -11,6 +112,13 @@ class RestAdapter:
         auth (Any): Authentication information (optional)
         proxies (dict): Dictionary of proxy addresses for HTTP(s) (optional)
         logger (Logger): Custom logger object (optional)
+        cache (ResponseCache): Cache consulted by GET requests given a cache_ttl (optional)
+        session_profile (str): Share the process-wide session of this header profile (optional)
+        pool_connections (int): Number of host connection pools to cache (optional)
+        pool_maxsize (int): Maximum number of kept-alive connections per host (optional)
+        max_retries (int): Number of retries per request, 0 disables retrying (optional)
+        backoff_factor (float): Base of the exponential backoff in seconds (optional)
+        backoff_max (float): Maximum seconds to wait between two attempts (optional)
     """
 
     def __init__(
@@ -20,17 +128,34 @@ class RestAdapter:
         auth=None,
         proxies: dict = {},
         logger=None,
+        cache=None,
+        session_profile: str = None,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        max_retries: int = 0,
+        backoff_factor: float = 0.5,
+        backoff_max: float = 60,
     ):
         self.base_url = base_url
         self.logger = logger or logging.getLogger(__name__)
+        self.cache = cache
+        self.auth = auth
+        self.headers = dict(headers or {})
 
-        self.session = requests.Session()
-        if headers:
-            self.session.headers.update(headers)
-        if auth:
-            self.session.auth = auth
-        if proxies:
-            self.session.proxies.update(proxies)
+        pool_options = dict(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=max_retries,
+            backoff_factor=backoff_factor,
+            backoff_max=backoff_max,
+        )
+        if session_profile:
+            # Headers and auth are sent per request, the shared session is never mutated
+            self.session = get_shared_session(session_profile, proxies, **pool_options)
+        else:
+            self.session = build_session(**pool_options)
+            if proxies:
+                self.session.proxies.update(proxies)
 
     def _send_request(
         self,
@@ -63,12 +188,15 @@ class RestAdapter:
         req = requests.Request(
             method,
             url,
-            headers=self.session.headers,
+            headers=self.headers,
             params=params,
             data=data,
             cookies=cookies,
+            auth=self.auth,
         )
         prep_req = self.session.prepare_request(req)
+        started = time.perf_counter()
+        status = "error"
         try:
             response = self.session.send(
                 prep_req,
@@ -76,6 +204,8 @@ class RestAdapter:
                 timeout=timeout,
                 allow_redirects=allow_redirects,
             )
+            status = response.status_code
+            http_response_bytes.inc(len(response.content), method=method)
             response.raise_for_status()
             self.logger.debug(f"Status [{response.status_code}] - {response.reason}")
             if response:
@@ -94,6 +224,10 @@ class RestAdapter:
             self.logger.error(f"Timeout Error: {errt}")
         except requests.exceptions.RequestException as err:
             self.logger.error(f"An Unexpected Error: {err}")
+        finally:
+            http_request_duration.observe(
+                time.perf_counter() - started, method=method, status=status
+            )
 
     def get(
         self,
@@ -103,6 +237,8 @@ class RestAdapter:
         verify: bool | str = None,
         timeout: int = None,
         allow_redirects: bool = True,
+        cache_ttl: int = None,
+        on_miss=None,
     ) -> dict:
         """Make a GET request.
 
@@ -113,11 +249,25 @@ class RestAdapter:
             verify (bool | str): Boolean whether to enforce SSL authentication, or supply a certificate to use (optional)
             timeout (int): Number of seconds to wait for a response (optional)
             allow_redirects (bool): Allow HTTP redirects to different URLs (optional)
+            cache_ttl (int): Seconds to cache the response for, requires a cache (optional)
+            on_miss (callable): Called right before the request is sent, when it
+                is not answered from the cache, e.g. to take a rate limiter token.
+                Its exceptions propagate (optional)
 
         Returns:
             dict: JSON serialized response body or None if an error occurs.
         """
-        return self._send_request(
+        use_cache = self.cache is not None and bool(cache_ttl)
+        if use_cache:
+            key = self.cache.make_key("GET", self.base_url + endpoint, params)
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.logger.debug(f"Cache hit [GET] - {self.base_url} {endpoint}")
+                return cached
+
+        if on_miss is not None:
+            on_miss()
+        response = self._send_request(
             "GET",
             endpoint,
             params=params,
@@ -126,6 +276,9 @@ class RestAdapter:
             timeout=timeout,
             allow_redirects=allow_redirects,
         )
+        if use_cache and response is not None:
+            self.cache.set(key, response, cache_ttl)
+        return response
 
     def post(
         self,
@@ -228,5 +381,3 @@ class RestAdapter:
             timeout=timeout,
             allow_redirects=allow_redirects,
         )
-
-
@@ -0,0 +1,63 @@
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+# Delete the flight only if it still belongs to the caller, so that a leader
+# finishing after its lock expired never releases the lock of a newer flight.
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class SingleFlight:
+    """Elect one leader per key among concurrent callers, through Redis.
+
+    The first caller to claim a key becomes its leader until it releases the
+    key or `ttl` seconds pass. Every other caller is told who the leader is,
+    so it can wait for the leader's result instead of doing the work again.
+
+    Args:
+        client (Redis): Redis client used to store the flights
+        ttl (int): Seconds after which an unreleased flight expires
+        prefix (str): Prefix of the Redis keys (optional)
+    """
+
+    def __init__(self, client, ttl: int, prefix: str = "singleflight"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self._release = client.register_script(RELEASE_SCRIPT)
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}:{key}"
+
+    def claim(self, key: str, owner: str) -> str:
+        """Become the leader of a key, or find out who is.
+
+        Args:
+            key (str): Identity of the work being done
+            owner (str): Identity of the caller
+
+        Returns:
+            str: `owner` when the caller leads the flight, else the current leader.
+        """
+        while True:
+            if self.client.set(self._key(key), owner, nx=True, ex=self.ttl):
+                return owner
+            leader = self.client.get(self._key(key))
+            if leader is not None:
+                logger.debug(f"Flight {key} already led by {leader.decode()}")
+                return leader.decode()
+            # The flight ended between SET and GET, try to lead the next one
+
+    def release(self, key: str, owner: str) -> bool:
+        """End the flight of a key if `owner` still leads it.
+
+        Returns:
+            bool: Whether the flight was released.
+        """
+        return bool(self._release(keys=[self._key(key)], args=[owner]))
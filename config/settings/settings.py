@@ -54,7 +54,9 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
+    "django_filters",
     "crawler",
 ]
 
@@ -62,6 +64,7 @@ MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
+    "django.middleware.http.ConditionalGetMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
@@ -154,17 +157,98 @@ REST_FRAMEWORK = {
         "rest_framework.permissions.DjangoModelPermissionsOrAnonReadOnly"
     ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
-    "PAGE_SIZE": 10,
+    "DEFAULT_FILTER_BACKENDS": ["django_filters.rest_framework.DjangoFilterBackend"],
+    "PAGE_SIZE": int(os.getenv("API_PAGE_SIZE", 10)),
 }
+# Upper bound of the `page_size` query parameter of cursor paginated lists.
+API_MAX_PAGE_SIZE = int(os.getenv("API_MAX_PAGE_SIZE", 1000))
+# Matches returned by the result search endpoint when no limit is given.
+SEARCH_PAGE_SIZE = int(os.getenv("SEARCH_PAGE_SIZE", 20))
+# Longest window, in days, of the rank analytics endpoint.
+ANALYTICS_MAX_DAYS = int(os.getenv("ANALYTICS_MAX_DAYS", 365))
+# Seconds API GET responses are cached in Redis, 0 disables the cache.
+API_CACHE_TTL = int(os.getenv("API_CACHE_TTL", 300))
 
 # --- Celery settings ---
 # https://docs.celeryproject.org/en/stable/django/
-CELERY_BROKER_URL = "redis://redis:6379/0"
-CELERY_ACCEPT_CONTENT = ["json"]
-CELERY_TASK_SERIALIZER = "json"
-CELERY_RESULT_BACKEND = "redis://redis:6379/0"
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+
+CELERY_BROKER_URL = REDIS_URL
+# Messages and results are packed with msgpack and compressed, JSON is still
+# accepted so that messages queued before a deploy can be consumed.
+CELERY_ACCEPT_CONTENT = ["msgpack", "json"]
+CELERY_TASK_SERIALIZER = "msgpack"
+CELERY_RESULT_SERIALIZER = "msgpack"
+CELERY_TASK_COMPRESSION = os.getenv("CELERY_TASK_COMPRESSION", "zlib")
+CELERY_RESULT_COMPRESSION = os.getenv("CELERY_RESULT_COMPRESSION", "zlib")
+CELERY_RESULT_BACKEND = REDIS_URL
+# Seconds task results are kept in the result backend.
+CELERY_RESULT_EXPIRES = int(os.getenv("CELERY_RESULT_EXPIRES", 3600))
+# Task payloads larger than this many bytes are passed by reference to a copy
+# kept in Redis for CLAIM_CHECK_TTL seconds.
+CLAIM_CHECK_THRESHOLD = int(os.getenv("CLAIM_CHECK_THRESHOLD", 16 * 1024))
+CLAIM_CHECK_TTL = int(os.getenv("CLAIM_CHECK_TTL", 3600))
 CELERY_TIMEZONE = "UTC"
 
+# Seconds between two pushes of a process' metrics to Redis.
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", 10))
+
+# --- Crawler settings ---
+# Requests to Google share one token bucket per egress (proxy or direct).
+CRAWLER_RATE_LIMIT_PER_MINUTE = float(os.getenv("CRAWLER_RATE_LIMIT_PER_MINUTE", 30))
+CRAWLER_RATE_LIMIT_BURST = int(os.getenv("CRAWLER_RATE_LIMIT_BURST", 5))
+# Fetched SERP pages are cached in Redis, configs can override the TTL (0 disables).
+CRAWLER_CACHE_TTL = int(os.getenv("CRAWLER_CACHE_TTL", 3600))
+CRAWLER_CACHE_MAX_ENTRIES = int(os.getenv("CRAWLER_CACHE_MAX_ENTRIES", 10000))
+# HTTP sessions are shared per worker process, with retries on 429/5xx responses.
+CRAWLER_HTTP_POOL_CONNECTIONS = int(os.getenv("CRAWLER_HTTP_POOL_CONNECTIONS", 10))
+CRAWLER_HTTP_POOL_MAXSIZE = int(os.getenv("CRAWLER_HTTP_POOL_MAXSIZE", 20))
+CRAWLER_HTTP_MAX_RETRIES = int(os.getenv("CRAWLER_HTTP_MAX_RETRIES", 3))
+CRAWLER_HTTP_BACKOFF_FACTOR = float(os.getenv("CRAWLER_HTTP_BACKOFF_FACTOR", 1.0))
+CRAWLER_HTTP_BACKOFF_MAX = float(os.getenv("CRAWLER_HTTP_BACKOFF_MAX", 30))
+# Browser user agents sampled once per worker process and used in turn.
+CRAWLER_USER_AGENT_POOL_SIZE = int(os.getenv("CRAWLER_USER_AGENT_POOL_SIZE", 50))
+# Most results asked for in one request (Google's `num`), and the share of already
+# seen results past which search() stops requesting more pages.
+CRAWLER_SERP_MAX_NUM = int(os.getenv("CRAWLER_SERP_MAX_NUM", 100))
+CRAWLER_SERP_MAX_DUPLICATE_RATIO = float(
+    os.getenv("CRAWLER_SERP_MAX_DUPLICATE_RATIO", 0.8)
+)
+# SERP parser engine, "streaming" (fast) or "soup" (BeautifulSoup reference).
+CRAWLER_SERP_PARSER = os.getenv("CRAWLER_SERP_PARSER", "streaming")
+# Rows per INSERT when persisting search results.
+CRAWLER_PERSIST_BATCH_SIZE = int(os.getenv("CRAWLER_PERSIST_BATCH_SIZE", 1000))
+# Results are partitioned by month: partitions created ahead of the current month,
+# and months of results kept by manage_result_partitions (0 keeps everything).
+CRAWLER_RESULT_PARTITIONS_AHEAD = int(os.getenv("CRAWLER_RESULT_PARTITIONS_AHEAD", 3))
+CRAWLER_RESULT_RETENTION_MONTHS = int(os.getenv("CRAWLER_RESULT_RETENTION_MONTHS", 0))
+# Fetched pages are kept compressed in append-only segment files ("" disables).
+CRAWLER_ARCHIVE_DIR = os.getenv(
+    "CRAWLER_ARCHIVE_DIR", str(BASE_DIR / "archive" / "serp")
+)
+CRAWLER_ARCHIVE_SEGMENT_SIZE = int(
+    os.getenv("CRAWLER_ARCHIVE_SEGMENT_SIZE", 256 * 1024 * 1024)
+)
+CRAWLER_ARCHIVE_BATCH_SIZE = int(os.getenv("CRAWLER_ARCHIVE_BATCH_SIZE", 50))
+CRAWLER_ARCHIVE_FLUSH_INTERVAL = float(os.getenv("CRAWLER_ARCHIVE_FLUSH_INTERVAL", 5))
+# Identical crawls submitted while one is running share its results instead of
+# fetching again, for at most this many seconds (0 disables coalescing).
+CRAWLER_COALESCE_WINDOW = int(os.getenv("CRAWLER_COALESCE_WINDOW", 600))
+# Batch submissions are enqueued as Celery chunks of this many crawls.
+CRAWLER_BATCH_CHUNK_SIZE = int(os.getenv("CRAWLER_BATCH_CHUNK_SIZE", 100))
+CRAWLER_BATCH_MAX_SIZE = int(os.getenv("CRAWLER_BATCH_MAX_SIZE", 50000))
+# Most configs enqueued for a re-crawl by one run of the scheduler.
+CRAWLER_RECRAWL_BATCH_SIZE = int(os.getenv("CRAWLER_RECRAWL_BATCH_SIZE", 1000))
+# Rows fetched at a time from the server-side cursor of result exports.
+CRAWLER_EXPORT_CHUNK_SIZE = int(os.getenv("CRAWLER_EXPORT_CHUNK_SIZE", 2000))
+# Persist each page as soon as it is parsed instead of merging in the chord callback.
+CRAWLER_STREAM_RESULTS = os.getenv("CRAWLER_STREAM_RESULTS", "True").lower() in (
+    "true",
+    "1",
+    "y",
+    "yes",
+)
+
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
@@ -1,3 +1,40 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import GoogleSearchConfig, GoogleSearchResult
+
+
+@admin.register(GoogleSearchConfig)
+class GoogleSearchConfigAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "term",
+        "status",
+        "result_count",
+        "domain_count",
+        "latest_crawled_at",
+        "created_at",
+    )
+    list_filter = ("status",)
+    search_fields = ("term",)
+    list_select_related = ("summary",)
+
+    @admin.display(ordering="summary__result_count")
+    def result_count(self, obj):
+        return obj.summary.result_count if hasattr(obj, "summary") else 0
+
+    @admin.display(ordering="summary__domain_count")
+    def domain_count(self, obj):
+        return obj.summary.domain_count if hasattr(obj, "summary") else 0
+
+    @admin.display(ordering="summary__latest_crawled_at")
+    def latest_crawled_at(self, obj):
+        return obj.summary.latest_crawled_at if hasattr(obj, "summary") else None
+
+
+@admin.register(GoogleSearchResult)
+class GoogleSearchResultAdmin(admin.ModelAdmin):
+    list_display = ("__str__", "domain", "crawled_at")
+    search_fields = ("title", "link")
+    # __str__ reads the config term
+    list_select_related = ("config",)
+    raw_id_fields = ("config",)
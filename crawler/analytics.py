@@ -0,0 +1,208 @@
+import numpy as np
+from datetime import datetime, timedelta
+
+
+SECONDS_PER_DAY = 86400
+# Same layout as crawler.models.OBSERVATION, so packed series are read in place
+OBSERVATION_DTYPE = np.dtype([("time", "<u4"), ("position", "<u2")])
+# Position observed once a link left the page, crawler.models.OFF_PAGE
+OFF_PAGE = 0
+
+
+class RankHistory:
+    """Observations of many rank series held in flat numpy arrays.
+
+    Every observation of every series is in `times` and `positions`, with
+    `series` holding the index of the series it belongs to, so computations
+    are vectorized over all the series at once.
+
+    Args:
+        keys (list): (link, lang, region) of every series
+        blobs (list): Packed observations of every series, in the same order
+    """
+
+    def __init__(self, keys: list, blobs: list):
+        self.keys = keys
+        lengths = np.fromiter(
+            (len(blob) // OBSERVATION_DTYPE.itemsize for blob in blobs),
+            dtype=np.int64,
+            count=len(blobs),
+        )
+        observations = np.frombuffer(b"".join(blobs), dtype=OBSERVATION_DTYPE)
+        self.series = np.repeat(np.arange(len(blobs), dtype=np.int32), lengths)
+        self.times = observations["time"]
+        self.positions = observations["position"]
+
+    @classmethod
+    def from_queryset(cls, queryset):
+        """Load the series of a RankSeries queryset, one row per series."""
+        keys, blobs = [], []
+        for link, lang, region, observations in queryset.values_list(
+            "link", "lang", "region", "observations"
+        ).iterator(chunk_size=2000):
+            keys.append((link, lang, region))
+            blobs.append(bytes(observations))
+        return cls(keys, blobs)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def daily(self, start: datetime, days: int) -> np.ndarray:
+        """Return the position of every series at the end of each day.
+
+        Series are step functions, a position holds until the next observation,
+        and the last observation before `start` gives the position on day 0.
+        An OFF_PAGE observation ends the position, the link reads as NaN until
+        it is observed on the page again.
+
+        Args:
+            start (datetime): First instant of the first day
+            days (int): Number of days
+
+        Returns:
+            ndarray: (series, days) float32 matrix, NaN when the link was not
+            on the page or not observed yet.
+        """
+        grid = np.full(len(self) * days, np.nan, dtype=np.float32)
+        if len(self.times):
+            order = np.lexsort((self.times, self.series))
+            series = self.series[order].astype(np.int64)
+            day = (self.times[order].astype(np.int64) - int(start.timestamp())) // (
+                SECONDS_PER_DAY
+            )
+            kept = day < days
+            series, day = series[kept], np.maximum(day[kept], 0)
+            positions = self.positions[order][kept]
+            # Keys are sorted, the last observation of each (series, day) wins
+            key = series * days + day
+            last = np.append(key[1:] != key[:-1], True)
+            grid[key[last]] = positions[last]
+        grid = grid.reshape(len(self), days)
+
+        # Forward fill every row with the index of its last observed day
+        observed = ~np.isnan(grid)
+        index = np.where(observed, np.arange(days, dtype=np.int32), 0)
+        np.maximum.accumulate(index, axis=1, out=index)
+        filled = grid[np.arange(len(self))[:, None], index]
+        filled[filled == OFF_PAGE] = np.nan
+        return filled
+
+
+def _row_stats(matrix: np.ndarray):
+    observed = ~np.isnan(matrix)
+    values = np.where(observed, matrix, 0).astype(np.float64)
+    return observed, observed.sum(axis=1), values
+
+
+def trend(matrix: np.ndarray) -> np.ndarray:
+    """Least squares slope of every row in positions per day, negative is rising."""
+    observed, count, values = _row_stats(matrix)
+    x = np.arange(matrix.shape[1], dtype=np.float64)
+    sum_x = observed @ x
+    sum_xx = observed @ (x * x)
+    sum_y = values.sum(axis=1)
+    sum_xy = values @ x
+    denominator = count * sum_xx - sum_x * sum_x
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(
+            denominator > 0, (count * sum_xy - sum_x * sum_y) / denominator, np.nan
+        )
+
+
+def volatility(matrix: np.ndarray) -> np.ndarray:
+    """Standard deviation of the day to day position changes of every row."""
+    observed, count, changes = _row_stats(np.diff(matrix, axis=1))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = changes.sum(axis=1) / count
+        variance = (changes * changes).sum(axis=1) / count - mean * mean
+    return np.sqrt(np.maximum(variance, 0))
+
+
+def endpoints(matrix: np.ndarray):
+    """Return the first and last observed position of every row, NaN when never observed."""
+    observed = ~np.isnan(matrix)
+    rows = np.arange(matrix.shape[0])
+    first = matrix[rows, np.argmax(observed, axis=1)]
+    last = matrix[rows, matrix.shape[1] - 1 - np.argmax(observed[:, ::-1], axis=1)]
+    return first, last
+
+
+def top_movers(change: np.ndarray, top: int):
+    """Return the indexes of the `top` largest rises and falls, ignoring NaN."""
+    ranked = np.argsort(np.where(np.isnan(change), 0, change), kind="stable")
+    rises = [index for index in ranked[::-1][:top] if change[index] > 0]
+    falls = [index for index in ranked[:top] if change[index] < 0]
+    return rises, falls
+
+
+def _number(value):
+    return None if np.isnan(value) else round(float(value), 3)
+
+
+def rank_report(queryset, end: datetime, days: int, top: int, link: str = None):
+    """Summarize the rank series of a query over the `days` days before `end`.
+
+    Args:
+        queryset (QuerySet): RankSeries of the query
+        end (datetime): End of the window
+        days (int): Length of the window in days
+        top (int): Number of links listed in the ranking and in each mover list
+        link (str): Link whose daily positions are included (optional)
+
+    Returns:
+        dict: Ranking of the links on the last day, top rises and falls, and the
+        daily history of `link`. Changes are positive when a link moved up.
+    """
+    start = end - timedelta(days=days)
+    history = RankHistory.from_queryset(queryset)
+    matrix = history.daily(start, days)
+    slopes, volatilities = trend(matrix), volatility(matrix)
+    first, last = endpoints(matrix)
+    change = first - last
+    days_on_page = (~np.isnan(matrix)).sum(axis=1)
+
+    def entry(index):
+        link, lang, region = history.keys[index]
+        return {
+            "link": link,
+            "lang": lang,
+            "region": region,
+            "position": _number(matrix[index, -1]),
+            "start_position": _number(first[index]),
+            "end_position": _number(last[index]),
+            "change": _number(change[index]),
+            "trend": _number(slopes[index]),
+            "volatility": _number(volatilities[index]),
+            "days_on_page": int(days_on_page[index]),
+        }
+
+    current = matrix[:, -1]
+    ranking = np.argsort(np.where(np.isnan(current), np.inf, current), kind="stable")
+    ranking = [index for index in ranking[:top] if not np.isnan(current[index])]
+    rises, falls = top_movers(change, top)
+    report = {
+        "start": start,
+        "end": end,
+        "days": days,
+        "series": len(history),
+        "observations": int(len(history.times)),
+        "ranking": [entry(index) for index in ranking],
+        "top_movers": {
+            "up": [entry(index) for index in rises],
+            "down": [entry(index) for index in falls],
+        },
+    }
+    if link:
+        dates = [(start + timedelta(days=day)).date() for day in range(days)]
+        report["history"] = [
+            {
+                **entry(index),
+                "daily": [
+                    {"date": date, "position": _number(position)}
+                    for date, position in zip(dates, matrix[index])
+                ],
+            }
+            for index, key in enumerate(history.keys)
+            if key[0] == link
+        ]
+    return report
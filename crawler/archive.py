@@ -0,0 +1,110 @@
+import logging
+import threading
+import time
+from django.conf import settings
+from django.utils import timezone
+
+from config.django.files_and_storage import SegmentArchive
+from .models import SerpSnapshot
+
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotRecorder:
+    """Archive fetched result pages of a process in batches.
+
+    Pages are buffered in memory and written to the segment archive together
+    with their SerpSnapshot index rows once `batch_size` pages are pending or
+    `flush_interval` seconds have passed. Content already archived is not
+    written again: the new index rows point at the existing record.
+
+    Args:
+        archive (SegmentArchive): Archive to write to, defaults to one in
+            CRAWLER_ARCHIVE_DIR (optional)
+        batch_size (int): Pages written at once (optional)
+        flush_interval (float): Maximum seconds a page stays buffered (optional)
+    """
+
+    def __init__(self, archive=None, batch_size=None, flush_interval=None):
+        self._archive = archive
+        self.batch_size = batch_size or settings.CRAWLER_ARCHIVE_BATCH_SIZE
+        self.flush_interval = (
+            settings.CRAWLER_ARCHIVE_FLUSH_INTERVAL
+            if flush_interval is None
+            else flush_interval
+        )
+        self._pending = []
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    @property
+    def archive(self) -> SegmentArchive:
+        if self._archive is None:
+            self._archive = SegmentArchive(
+                settings.CRAWLER_ARCHIVE_DIR,
+                segment_size=settings.CRAWLER_ARCHIVE_SEGMENT_SIZE,
+            )
+        return self._archive
+
+    def record(self, html: str, term, start, safe, lang, region, config_id=None):
+        """Buffer a fetched page with the parameters and config it was fetched for."""
+        snapshot = SerpSnapshot(
+            config_id=config_id,
+            term=term[:255],
+            start=start,
+            safe=safe,
+            lang=lang,
+            region=region,
+            fetched_at=timezone.now(),
+        )
+        with self._lock:
+            self._pending.append((html.encode("utf-8"), snapshot))
+        self.flush(force=False)
+
+    def flush(self, force: bool = True):
+        """Write the buffered pages, or only when a batch is due without `force`."""
+        with self._lock:
+            due = (
+                len(self._pending) >= self.batch_size
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            )
+            if not self._pending or not (force or due):
+                return
+            pending, self._pending = self._pending, []
+            self._last_flush = time.monotonic()
+        try:
+            self._write(pending)
+        except Exception:
+            logger.exception(f"Could not archive {len(pending)} result pages")
+
+    def _write(self, pending):
+        hashes = {}
+        for document, snapshot in pending:
+            snapshot.content_hash = hashes.setdefault(
+                document, SegmentArchive.content_hash(document)
+            )
+        locations = {
+            content_hash: (segment, offset, length)
+            for content_hash, segment, offset, length in SerpSnapshot.objects.filter(
+                content_hash__in=set(hashes.values())
+            )
+            .order_by()
+            .values_list("content_hash", "segment", "offset", "length")
+        }
+        new_documents = [
+            document
+            for document, content_hash in hashes.items()
+            if content_hash not in locations
+        ]
+        for content_hash, segment, offset, length in self.archive.append(new_documents):
+            locations[content_hash] = (segment, offset, length)
+
+        for _, snapshot in pending:
+            snapshot.segment, snapshot.offset, snapshot.length = locations[
+                snapshot.content_hash
+            ]
+        SerpSnapshot.objects.bulk_create(snapshot for _, snapshot in pending)
+
+
+snapshots = SnapshotRecorder()
@@ -0,0 +1,244 @@
+import itertools
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from django.db import transaction
+from django.utils import timezone
+
+from .models import GoogleSearchConfig, GoogleSearchResult
+from .parsers import PARSERS
+from .tasks import GoogleSearch, merge_search_pages
+
+
+FIXTURE_DIR = Path(__file__).resolve().parent / "fixtures" / "serp"
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+
+# Entry points timed by bench_startup, each run in a fresh interpreter, with
+# the environment variables docker-compose gives them
+WORKER_BOOT = (
+    "from config.django.celery import app; app.loader.import_default_modules()"
+)
+STARTUP_TARGETS = {
+    # Web process: settings, apps, URLs, views and every system check
+    "manage.py": (["manage.py", "check"], {}),
+    # Worker process boot: Celery app plus task module autodiscovery
+    "celery": (["-c", WORKER_BOOT], {"CELERY_SKIP_CHECKS": "1"}),
+    # Worker ready to fetch: the above plus a first GoogleSearch
+    "celery+search": (
+        [
+            "-c",
+            f"{WORKER_BOOT}; from crawler.tasks import GoogleSearch; GoogleSearch()",
+        ],
+        {"CELERY_SKIP_CHECKS": "1"},
+    ),
+}
+IMPORTTIME_RE = re.compile(r"import time:\s+\d+ \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def load_corpus(path: Path = FIXTURE_DIR) -> dict:
+    """Read every saved SERP page of a directory, keyed by file name."""
+    return {
+        file.name: file.read_text(encoding="utf-8")
+        for file in sorted(path.glob("*.html"))
+    }
+
+
+class FixtureRestAdapter:
+    """Stand-in for RestAdapter serving saved pages in turn, without network."""
+
+    def __init__(self, pages):
+        self.pages = itertools.cycle(pages)
+        self.requests = 0
+
+    def get(self, endpoint, params=None, on_miss=None, **kwargs):
+        if on_miss is not None:
+            on_miss()
+        self.requests += 1
+        return next(self.pages)
+
+
+class UnlimitedBucket:
+    """Stand-in for TokenBucket that never limits, so no Redis is needed."""
+
+    def consume(self, tokens=1):
+        pass
+
+
+def _timed(function, repeat: int) -> float:
+    """Return the best wall-clock time of `repeat` runs of `function`."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def bench_parse(corpus: dict, repeat: int = 5) -> dict:
+    """Measure pages and results parsed per second by every parser engine."""
+    pages = list(corpus.values())
+    report = {}
+    for name, engine in PARSERS.items():
+        parser = engine()
+        results = sum(len(list(parser.parse(page))) for page in pages)
+        seconds = _timed(lambda: [list(parser.parse(page)) for page in pages], repeat)
+        report[name] = {
+            "pages": len(pages),
+            "results": results,
+            "seconds": seconds,
+            "pages_per_second": len(pages) / seconds,
+            "results_per_second": results / seconds,
+        }
+    return report
+
+
+def bench_search(corpus: dict, results: int = 100, repeat: int = 5) -> dict:
+    """Measure GoogleSearch.search() over saved pages with a stubbed RestAdapter.
+
+    The parse time of the same pages is subtracted to isolate the cost of the
+    pagination loop itself.
+    """
+    reference = PARSERS["soup"]()
+    pages = [page for page in corpus.values() if any(reference.parse(page))]
+    report = {}
+    for name in PARSERS:
+        goog = GoogleSearch(parser=name)
+        goog.limiter = UnlimitedBucket()
+        requests = 0
+
+        def run():
+            nonlocal requests
+            goog.rest = FixtureRestAdapter(pages)
+            list(goog.search("benchmark", results, "off", 0, "en", "us"))
+            requests = goog.rest.requests
+
+        seconds = _timed(run, repeat)
+        served = [pages[i % len(pages)] for i in range(requests)]
+        parse_seconds = _timed(
+            lambda: [list(goog.parser.parse(page)) for page in served], repeat
+        )
+        report[name] = {
+            "results": results,
+            "requests": requests,
+            "seconds": seconds,
+            "seconds_per_request": seconds / requests,
+            "overhead_seconds_per_page": max(0.0, seconds - parse_seconds) / requests,
+        }
+    return report
+
+
+def bench_persist(sizes=(10, 1000, 100000)) -> dict:
+    """Measure the insert rate of the persist step for each result count.
+
+    The pages are merged and stored the way process_search_results_task does,
+    without its claim checks, cache invalidation and crawl completion, so only
+    the database is needed. Every run happens in a transaction that is rolled
+    back, so the benchmark leaves the database untouched.
+    """
+    report = {}
+    for size in sizes:
+        with transaction.atomic():
+            config = GoogleSearchConfig.objects.create(
+                term="benchmark", results=size, safe="off"
+            )
+            pages = [
+                {
+                    "start": start,
+                    "results": [
+                        {
+                            "link": f"https://example.com/{config.id}/{index}",
+                            "title": f"Benchmark result {index}",
+                            "description": "Benchmark description " * 8,
+                        }
+                        for index in range(start, min(start + 10, size))
+                    ],
+                }
+                for start in range(0, size, 10)
+            ]
+            started = time.perf_counter()
+            results = merge_search_pages(pages, config.results)
+            GoogleSearchResult.objects.persist(config.id, results)
+            seconds = time.perf_counter() - started
+            transaction.set_rollback(True)
+        report[str(size)] = {
+            "results": size,
+            "seconds": seconds,
+            "rows_per_second": size / seconds,
+        }
+    return report
+
+
+def _slowest_imports(stderr: str, top: int) -> list:
+    """Return the top-level imports with the largest cumulative time, from -X importtime."""
+    imports = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if match and not match.group(2):
+            imports.append((int(match.group(1)) / 1e6, match.group(3)))
+    return [
+        {"module": module, "seconds": seconds}
+        for seconds, module in sorted(imports, reverse=True)[:top]
+    ]
+
+
+def bench_startup(repeat: int = 5, top_imports: int = 10, targets=None) -> dict:
+    """Measure the wall-clock startup time of the web and worker entry points.
+
+    Every run starts a new interpreter, so nothing is shared with this process.
+    One extra run with `-X importtime` lists the slowest top-level imports.
+    """
+    report = {}
+    for name, (arguments, env) in (targets or STARTUP_TARGETS).items():
+        env = {**os.environ, **env}
+        seconds = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            subprocess.run(
+                [sys.executable, *arguments],
+                cwd=PROJECT_DIR,
+                env=env,
+                check=True,
+                capture_output=True,
+            )
+            seconds.append(time.perf_counter() - started)
+        profile = subprocess.run(
+            [sys.executable, "-X", "importtime", *arguments],
+            cwd=PROJECT_DIR,
+            env=env,
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+        report[name] = {
+            "runs": repeat,
+            "best_seconds": min(seconds),
+            "median_seconds": statistics.median(seconds),
+            "slowest_imports": _slowest_imports(profile.stderr, top_imports),
+        }
+    return report
+
+
+def run_benchmarks(
+    corpus_path: Path = FIXTURE_DIR,
+    repeat: int = 5,
+    search_results: int = 100,
+    persist_sizes=(10, 1000, 100000),
+) -> dict:
+    """Run the whole suite and return a JSON serializable report."""
+    corpus = load_corpus(corpus_path)
+    report = {
+        "started_at": timezone.now().isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "corpus": {"path": str(corpus_path), "pages": len(corpus)},
+        "parse": bench_parse(corpus, repeat),
+        "search": bench_search(corpus, search_results, repeat),
+    }
+    if persist_sizes:
+        report["persist"] = bench_persist(persist_sizes)
+    return report
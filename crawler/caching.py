@@ -0,0 +1,174 @@
+import hashlib
+import logging
+import time
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.http import http_date
+from rest_framework.settings import api_settings
+
+from config.django.redis_client import get_redis_client
+
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "apicache"
+# Only responses rendered to one of these are stored, the browsable API holds
+# the user name and CSRF token of whoever requested it
+CACHED_MEDIA_TYPES = ("application/json",)
+
+# Move every version key to the current time in milliseconds, or one past its
+# current value when that is ahead, so that a version never repeats.
+BUMP_SCRIPT = """
+local now = tonumber(ARGV[1])
+for _, key in ipairs(KEYS) do
+    local current = tonumber(redis.call('GET', key) or '0')
+    redis.call('SET', key, math.max(now, current + 1))
+end
+"""
+
+
+def _version_key(scope: str) -> str:
+    return f"{PREFIX}:version:{scope}"
+
+
+def invalidate(*scopes):
+    """Make every cached response depending on one of the scopes stale.
+
+    Nothing is deleted: the scope versions are part of the cache keys, so
+    stale entries are simply never read again and expire on their own.
+
+    Args:
+        *scopes (str): "configs", "results" or "results:<config id>"
+    """
+    if not settings.API_CACHE_TTL or not scopes:
+        return
+    try:
+        client = get_redis_client()
+        client.register_script(BUMP_SCRIPT)(
+            keys=[_version_key(scope) for scope in scopes],
+            args=[int(time.time() * 1000)],
+        )
+    except Exception as exc:
+        logger.warning(f"Could not invalidate the API cache of {scopes}: {exc}")
+
+
+def invalidate_on_commit(*scopes):
+    """Invalidate the scopes once the current transaction commits, if any."""
+    transaction.on_commit(lambda: invalidate(*scopes))
+
+
+def invalidate_configs(*config_ids, cascade=False):
+    """Invalidate the config responses, and with `cascade` the results of the configs."""
+    if cascade:
+        invalidate_on_commit("configs", *result_scopes(config_ids))
+    else:
+        invalidate_on_commit("configs")
+
+
+def invalidate_results(*config_ids):
+    """Invalidate the result responses of the configs and the unscoped result lists."""
+    invalidate_on_commit(*result_scopes(config_ids))
+
+
+def result_scopes(config_ids) -> list:
+    return ["results", *(f"results:{config_id}" for config_id in set(config_ids))]
+
+
+class CachedResponseMixin:
+    """Serve the GET actions of a viewset from Redis until their data changes.
+
+    Responses are stored rendered, under a key made of the request and of the
+    versions of the scopes returned by `cache_scopes`, with an ETag and a
+    Last-Modified date taken from those versions. A cached response costs one
+    Redis round-trip and no query, and ConditionalGetMiddleware turns it into
+    a 304 when the client already holds it. Only JSON responses are cached,
+    whatever the request asked for: HTML (browsable API) responses hold
+    per-user content.
+    """
+
+    cached_actions = ("list", "retrieve")
+
+    def cache_scopes(self, request, **kwargs) -> list:
+        raise NotImplementedError
+
+    def _cache_key(self, request, versions) -> str:
+        identity = "\x1f".join(
+            (
+                request.get_host(),
+                request.get_full_path(),
+                request.headers.get("Accept", ""),
+                *versions,
+            )
+        )
+        return f"{PREFIX}:response:{hashlib.sha256(identity.encode()).hexdigest()}"
+
+    def dispatch(self, request, *args, **kwargs):
+        action = getattr(self, "action_map", {}).get(request.method.lower())
+        # A ?format= or .json suffix overrides the Accept header
+        requested_format = kwargs.get("format") or request.GET.get(
+            api_settings.URL_FORMAT_OVERRIDE
+        )
+        if (
+            not settings.API_CACHE_TTL
+            or request.method not in ("GET", "HEAD")
+            or action not in self.cached_actions
+            or requested_format not in (None, "json")
+            or "text/html" in request.headers.get("Accept", "")
+        ):
+            return super().dispatch(request, *args, **kwargs)
+
+        client = get_redis_client()
+        scopes = self.cache_scopes(request, **kwargs)
+        try:
+            versions = [
+                (version or b"0").decode()
+                for version in client.mget([_version_key(scope) for scope in scopes])
+            ]
+            key = self._cache_key(request, versions)
+            cached = client.hgetall(key)
+        except Exception as exc:
+            logger.warning(f"API cache unavailable: {exc}")
+            return super().dispatch(request, *args, **kwargs)
+
+        if cached:
+            response = HttpResponse(
+                cached[b"body"], content_type=cached[b"content_type"].decode()
+            )
+            response["ETag"] = cached[b"etag"].decode()
+            response["Last-Modified"] = cached[b"last_modified"].decode()
+            response["X-Cache"] = "HIT"
+            return response
+
+        response = super().dispatch(request, *args, **kwargs)
+        renderer = getattr(response, "accepted_renderer", None)
+        if (
+            response.status_code != 200
+            or not hasattr(response, "render")
+            or renderer is None
+            or renderer.media_type not in CACHED_MEDIA_TYPES
+        ):
+            return response
+        response.render()
+        etag = f'"{hashlib.sha1(response.content).hexdigest()}"'
+        modified = max((int(version) for version in versions), default=0) / 1000
+        last_modified = http_date(modified or time.time())
+        response["ETag"] = etag
+        response["Last-Modified"] = last_modified
+        response["X-Cache"] = "MISS"
+        try:
+            pipe = client.pipeline()
+            pipe.hset(
+                key,
+                mapping={
+                    "body": response.content,
+                    "content_type": response["Content-Type"],
+                    "etag": etag,
+                    "last_modified": last_modified,
+                },
+            )
+            pipe.expire(key, settings.API_CACHE_TTL)
+            pipe.execute()
+        except Exception as exc:
+            logger.warning(f"Could not cache {request.get_full_path()}: {exc}")
+        return response
@@ -0,0 +1,62 @@
+import csv
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+EXPORT_FIELDS = (
+    "id",
+    "config_id",
+    "config__term",
+    "link",
+    "domain",
+    "title",
+    "description",
+    "crawled_at",
+)
+EXPORT_COLUMNS = tuple(field.replace("config__", "") for field in EXPORT_FIELDS)
+
+CONTENT_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+class _Echo:
+    """File-like object handing back what is written, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(queryset, chunk_size: int):
+    """Iterate over results as plain tuples through a server-side cursor.
+
+    Args:
+        queryset (QuerySet): Filtered GoogleSearchResult queryset
+        chunk_size (int): Rows fetched from the cursor at a time
+
+    Returns:
+        Iterator: Tuples ordered as EXPORT_COLUMNS.
+    """
+    return (
+        queryset.order_by("crawled_at", "id")
+        .values_list(*EXPORT_FIELDS)
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def iter_ndjson(rows):
+    """Yield one JSON document per row, each on its own line."""
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for row in rows:
+        yield encoder.encode(dict(zip(EXPORT_COLUMNS, row))) + "\n"
+
+
+def iter_csv(rows):
+    """Yield a header line then one CSV line per row."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+RENDERERS = {"ndjson": iter_ndjson, "csv": iter_csv}
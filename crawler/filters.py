@@ -0,0 +1,41 @@
+from django.db.models import Subquery
+from django_filters import rest_framework as filters
+
+from .models import GoogleSearchConfig, GoogleSearchResult
+from .utils import link_domain
+
+
+class GoogleSearchConfigFilter(filters.FilterSet):
+    term = filters.CharFilter()
+    created_at = filters.IsoDateTimeFromToRangeFilter()
+
+    class Meta:
+        model = GoogleSearchConfig
+        fields = ["term", "created_at"]
+
+
+class GoogleSearchResultFilter(filters.FilterSet):
+    """Filters of the result list, each one backed by an index.
+
+    `crawled_at_after` and `crawled_at_before` bound the crawl date, which
+    is the creation date of the result's config (see GoogleSearchResult), `domain`
+    matches the host of the link whatever its case or "www." prefix.
+    `config` also bounds the crawl date to the config's, so only its
+    partition is read.
+    """
+
+    config = filters.NumberFilter(field_name="config_id", method="filter_config")
+    term = filters.CharFilter(field_name="config__term")
+    domain = filters.CharFilter(method="filter_domain")
+    crawled_at = filters.IsoDateTimeFromToRangeFilter()
+
+    class Meta:
+        model = GoogleSearchResult
+        fields = ["config", "term", "domain", "crawled_at"]
+
+    def filter_config(self, queryset, name, value):
+        crawled_at = GoogleSearchConfig.objects.filter(pk=value).values("created_at")
+        return queryset.filter(config_id=value, crawled_at=Subquery(crawled_at[:1]))
+
+    def filter_domain(self, queryset, name, value):
+        return queryset.filter(domain=link_domain(f"//{value.strip()}"))
@@ -0,0 +1,66 @@
+import json
+from pathlib import Path
+from django.core.management.base import BaseCommand
+
+from crawler.benchmarks import FIXTURE_DIR, run_benchmarks
+
+
+class Command(BaseCommand):
+    help = "Benchmark parsing, pagination and persistence offline against saved SERP pages."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--corpus",
+            type=Path,
+            default=FIXTURE_DIR,
+            help="Directory of saved SERP HTML pages",
+        )
+        parser.add_argument(
+            "--output",
+            type=Path,
+            default=Path("benchmarks.json"),
+            help="File the JSON report is written to",
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=5, help="Runs per measurement, best is kept"
+        )
+        parser.add_argument(
+            "--search-results",
+            type=int,
+            default=100,
+            help="Results collected by each search() run",
+        )
+        parser.add_argument(
+            "--persist-sizes",
+            type=int,
+            nargs="*",
+            default=[10, 1000, 100000],
+            help="Result counts persisted by the insert benchmark",
+        )
+        parser.add_argument(
+            "--skip-db",
+            action="store_true",
+            help="Skip the benchmarks that need a database",
+        )
+
+    def handle(self, *args, **options):
+        report = run_benchmarks(
+            corpus_path=options["corpus"],
+            repeat=options["repeat"],
+            search_results=options["search_results"],
+            persist_sizes=() if options["skip_db"] else options["persist_sizes"],
+        )
+        options["output"].write_text(json.dumps(report, indent=2))
+
+        for engine, stats in report["parse"].items():
+            self.stdout.write(
+                f"parse[{engine}]: {stats['pages_per_second']:.1f} pages/s"
+            )
+        for engine, stats in report["search"].items():
+            self.stdout.write(
+                f"search[{engine}]: {stats['requests']} requests, "
+                f"{stats['overhead_seconds_per_page'] * 1000:.3f} ms overhead/page"
+            )
+        for size, stats in report.get("persist", {}).items():
+            self.stdout.write(f"persist[{size}]: {stats['rows_per_second']:.0f} rows/s")
+        self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
@@ -0,0 +1,40 @@
+import json
+from pathlib import Path
+from django.core.management.base import BaseCommand
+
+from crawler.benchmarks import bench_startup
+
+
+class Command(BaseCommand):
+    help = "Measure how long the web and Celery worker entry points take to start."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--repeat", type=int, default=5, help="Runs per entry point"
+        )
+        parser.add_argument(
+            "--top-imports",
+            type=int,
+            default=10,
+            help="Slowest top-level imports listed per entry point",
+        )
+        parser.add_argument(
+            "--output",
+            type=Path,
+            help="File the JSON report is written to (optional)",
+        )
+
+    def handle(self, *args, **options):
+        report = bench_startup(options["repeat"], options["top_imports"])
+        if options["output"]:
+            options["output"].write_text(json.dumps(report, indent=2))
+
+        for target, stats in report.items():
+            self.stdout.write(
+                f"{target}: best {stats['best_seconds'] * 1000:.0f} ms, "
+                f"median {stats['median_seconds'] * 1000:.0f} ms"
+            )
+            for entry in stats["slowest_imports"]:
+                self.stdout.write(
+                    f"    {entry['seconds'] * 1000:7.1f} ms  {entry['module']}"
+                )
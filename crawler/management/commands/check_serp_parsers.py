@@ -0,0 +1,49 @@
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+
+from crawler.parsers import PARSERS, SoupSerpParser
+
+
+FIXTURE_DIR = Path(__file__).resolve().parent.parent.parent / "fixtures" / "serp"
+
+
+class Command(BaseCommand):
+    help = (
+        "Check that every SERP parser engine gives the reference output on saved pages."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "paths",
+            nargs="*",
+            type=Path,
+            help="HTML files or directories of HTML files (defaults to the fixture corpus)",
+        )
+
+    def handle(self, *args, **options):
+        files = []
+        for path in options["paths"] or [FIXTURE_DIR]:
+            files.extend(sorted(path.glob("*.html")) if path.is_dir() else [path])
+        if not files:
+            raise CommandError("No HTML files to check.")
+
+        reference = SoupSerpParser()
+        engines = [
+            engine() for name, engine in PARSERS.items() if name != reference.name
+        ]
+        mismatches = 0
+        for file in files:
+            html = file.read_text(encoding="utf-8")
+            expected = list(reference.parse(html))
+            for engine in engines:
+                if list(engine.parse(html)) != expected:
+                    mismatches += 1
+                    self.stderr.write(
+                        f"{engine.name} differs from {reference.name} on {file}"
+                    )
+
+        if mismatches:
+            raise CommandError(f"{mismatches} mismatches over {len(files)} pages.")
+        self.stdout.write(
+            self.style.SUCCESS(f"All engines agree on {len(files)} pages.")
+        )
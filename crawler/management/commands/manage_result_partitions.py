@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from crawler.partitions import ensure_result_partitions, prune_result_partitions
+
+
+class Command(BaseCommand):
+    help = "Create the upcoming monthly result partitions and drop the expired ones."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--ahead",
+            type=int,
+            default=settings.CRAWLER_RESULT_PARTITIONS_AHEAD,
+            help="Months after the current one to create partitions for",
+        )
+        parser.add_argument(
+            "--retain",
+            type=int,
+            default=settings.CRAWLER_RESULT_RETENTION_MONTHS,
+            help="Months of results kept, the current one included (0 keeps all)",
+        )
+        parser.add_argument(
+            "--detach",
+            action="store_true",
+            help="Detach expired partitions into standalone tables instead of dropping them",
+        )
+
+    def handle(self, *args, **options):
+        for name in ensure_result_partitions(options["ahead"]):
+            self.stdout.write(f"Created {name}")
+        if options["retain"] > 0:
+            for name in prune_result_partitions(options["retain"], options["detach"]):
+                self.stdout.write(
+                    f"{'Detached' if options['detach'] else 'Dropped'} {name}"
+                )
+        self.stdout.write(self.style.SUCCESS("Result partitions are up to date."))
@@ -0,0 +1,95 @@
+from datetime import datetime
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from crawler.models import GoogleSearchConfig
+from crawler.parsers import PARSERS
+from crawler.reparse import Checkpoint, reparse_archive
+
+
+def aware_datetime(value: str) -> datetime:
+    moment = datetime.fromisoformat(value)
+    return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
+
+class Command(BaseCommand):
+    help = "Re-parse archived SERP pages in parallel and upsert the results of their configs."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--since",
+            type=aware_datetime,
+            help="Only configs created at or after this ISO date",
+        )
+        parser.add_argument(
+            "--until",
+            type=aware_datetime,
+            help="Only configs created before this ISO date",
+        )
+        parser.add_argument("--term", help="Only configs of this exact term")
+        parser.add_argument(
+            "--engine",
+            choices=sorted(PARSERS),
+            default=settings.CRAWLER_SERP_PARSER,
+            help="Parser engine to re-parse with",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            help="Parser processes (defaults to the number of CPUs)",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            type=Path,
+            help="File the progress is saved to (defaults to one in the archive)",
+        )
+        parser.add_argument(
+            "--checkpoint-every",
+            type=int,
+            default=100,
+            help="Configs between two checkpoint saves",
+        )
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="Ignore the saved checkpoint and start from the first config",
+        )
+
+    def handle(self, *args, **options):
+        if not settings.CRAWLER_ARCHIVE_DIR:
+            raise CommandError("CRAWLER_ARCHIVE_DIR is not set, nothing is archived.")
+        archive_root = Path(settings.CRAWLER_ARCHIVE_DIR)
+
+        configs = GoogleSearchConfig.objects.all()
+        if options["since"]:
+            configs = configs.filter(created_at__gte=options["since"])
+        if options["until"]:
+            configs = configs.filter(created_at__lt=options["until"])
+        if options["term"]:
+            configs = configs.filter(term=options["term"])
+
+        checkpoint = Checkpoint(
+            options["checkpoint"] or archive_root / "reparse.checkpoint.json"
+        )
+        if options["reset"]:
+            checkpoint.reset()
+
+        stats = reparse_archive(
+            configs,
+            archive_root,
+            checkpoint,
+            engine=options["engine"],
+            workers=options["workers"],
+            checkpoint_every=options["checkpoint_every"],
+            progress=lambda stats: self.stdout.write(
+                f"{stats['configs']} configs, {stats['results']} results"
+            ),
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Re-parsed {stats['pages']} pages of {stats['configs']} configs into "
+                f"{stats['results']} results, {stats['skipped']} configs had no archived page."
+            )
+        )
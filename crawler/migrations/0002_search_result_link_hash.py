@@ -0,0 +1,49 @@
+from django.db import migrations, models
+
+from crawler.utils import link_hash
+
+
+def populate_link_hash(apps, schema_editor):
+    GoogleSearchResult = apps.get_model("crawler", "GoogleSearchResult")
+    seen = set()
+    duplicates = []
+    batch = []
+    for result in GoogleSearchResult.objects.order_by("id").iterator(chunk_size=2000):
+        result.link_hash = link_hash(result.link)
+        key = (result.config_id, result.link_hash)
+        if key in seen:
+            duplicates.append(result.id)
+            continue
+        seen.add(key)
+        batch.append(result)
+        if len(batch) >= 2000:
+            GoogleSearchResult.objects.bulk_update(batch, ["link_hash"])
+            batch = []
+    GoogleSearchResult.objects.bulk_update(batch, ["link_hash"])
+    GoogleSearchResult.objects.filter(id__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crawler', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='googlesearchresult',
+            name='link',
+            field=models.URLField(max_length=2048),
+        ),
+        migrations.AddField(
+            model_name='googlesearchresult',
+            name='link_hash',
+            field=models.CharField(default='', editable=False, max_length=64),
+            preserve_default=False,
+        ),
+        migrations.RunPython(populate_link_hash, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='googlesearchresult',
+            constraint=models.UniqueConstraint(fields=('config', 'link_hash'), name='unique_search_result_link'),
+        ),
+    ]
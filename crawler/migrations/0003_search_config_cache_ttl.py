@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-18 07:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crawler', '0002_search_result_link_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='googlesearchconfig',
+            name='cache_ttl',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
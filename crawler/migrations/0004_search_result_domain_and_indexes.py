@@ -0,0 +1,52 @@
+from django.db import migrations, models
+
+from crawler.utils import link_domain
+
+
+def populate_domain(apps, schema_editor):
+    GoogleSearchResult = apps.get_model("crawler", "GoogleSearchResult")
+    batch = []
+    for result in GoogleSearchResult.objects.only("id", "link").iterator(chunk_size=2000):
+        result.domain = link_domain(result.link)[:255]
+        batch.append(result)
+        if len(batch) >= 2000:
+            GoogleSearchResult.objects.bulk_update(batch, ["domain"])
+            batch = []
+    GoogleSearchResult.objects.bulk_update(batch, ["domain"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crawler', '0003_search_config_cache_ttl'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='googlesearchresult',
+            name='domain',
+            field=models.CharField(default='', editable=False, max_length=255),
+            preserve_default=False,
+        ),
+        migrations.RunPython(populate_domain, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='googlesearchconfig',
+            index=models.Index(fields=['-created_at', '-id'], name='search_config_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='googlesearchconfig',
+            index=models.Index(fields=['term', '-created_at', '-id'], name='search_config_term_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='googlesearchresult',
+            index=models.Index(fields=['-crawled_at', '-id'], name='search_result_crawled_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='googlesearchresult',
+            index=models.Index(fields=['config', '-crawled_at', '-id'], name='search_result_config_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='googlesearchresult',
+            index=models.Index(fields=['domain', '-crawled_at', '-id'], name='search_result_domain_idx'),
+        ),
+    ]
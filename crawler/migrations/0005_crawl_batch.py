@@ -0,0 +1,43 @@
+# Generated by Django 5.1.6 on 2026-10-18 07:57
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def mark_existing_configs_completed(apps, schema_editor):
+    # Configs created before statuses existed were crawled right away
+    GoogleSearchConfig = apps.get_model("crawler", "GoogleSearchConfig")
+    GoogleSearchConfig.objects.update(status="completed")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crawler', '0004_search_result_domain_and_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CrawlBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='googlesearchconfig',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed')], default='pending', max_length=16),
+        ),
+        migrations.RunPython(mark_existing_configs_completed, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='googlesearchconfig',
+            name='batch',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='configs', to='crawler.crawlbatch'),
+        ),
+        migrations.AddIndex(
+            model_name='googlesearchconfig',
+            index=models.Index(fields=['batch', 'status'], name='search_config_batch_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.6 on 2026-10-18 07:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crawler', '0005_crawl_batch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='googlesearchconfig',
+            name='coalesced_into',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='coalesced', to='crawler.googlesearchconfig'),
+        ),
+        migrations.AddField(
+            model_name='googlesearchconfig',
+            name='fingerprint',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.6 on 2026-10-18 08:01
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crawler', '0006_search_config_coalescing'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SerpSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=255)),
+                ('start', models.PositiveIntegerField()),
+                ('safe', models.CharField(max_length=30)),
+                ('lang', models.CharField(blank=True, max_length=4, null=True)),
+                ('region', models.CharField(blank=True, max_length=4, null=True)),
+                ('fetched_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('content_hash', models.CharField(max_length=64)),
+                ('segment', models.CharField(max_length=255)),
+                ('offset', models.BigIntegerField()),
+                ('length', models.PositiveIntegerField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term', 'lang', 'region', '-fetched_at'], name='serp_snapshot_term_idx'), models.Index(fields=['content_hash'], name='serp_snapshot_hash_idx'), models.Index(fields=['segment', 'offset'], name='serp_snapshot_location_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.6 on 2026-10-18 08:03
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crawler', '0007_serp_snapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='googlesearchresult',
+            name='search_vector',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.SearchVector('title', config='english', weight='A'), '||', django.contrib.postgres.search.SearchVector('description', config='english', weight='B'), django.contrib.postgres.search.SearchConfig('english')), output_field=django.contrib.postgres.search.SearchVectorField()),
+        ),
+        migrations.AddIndex(
+            model_name='googlesearchresult',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='search_result_fts_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.6 on 2026-10-18 08:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_summaries(apps, schema_editor):
+    GoogleSearchResult = apps.get_model("crawler", "GoogleSearchResult")
+    GoogleSearchResultSummary = apps.get_model("crawler", "GoogleSearchResultSummary")
+    stats = (
+        GoogleSearchResult.objects.values("config_id")
+        .order_by()
+        .annotate(
+            result_count=models.Count("id"),
+            domain_count=models.Count("domain", distinct=True),
+            latest_crawled_at=models.Max("crawled_at"),
+        )
+    )
+    GoogleSearchResultSummary.objects.bulk_create(
+        (GoogleSearchResultSummary(**row) for row in stats.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crawler', '0008_search_result_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GoogleSearchResultSummary',
+            fields=[
+                ('config', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='crawler.googlesearchconfig')),
+                ('result_count', models.PositiveIntegerField(default=0)),
+                ('domain_count', models.PositiveIntegerField(default=0)),
+                ('latest_crawled_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(build_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,128 @@
+# Generated by Django 5.1.6 on 2026-10-18 08:30
+
+import django.db.models.deletion
+from datetime import datetime, timezone
+from django.db import migrations, models
+
+
+TABLE = "crawler_googlesearchresult"
+LEGACY = "crawler_googlesearchresult_legacy"
+COLUMNS = "id, link, link_hash, domain, title, description, crawled_at, config_id"
+# Months prepared after the current one, later ones are created by the
+# manage_result_partitions command
+PARTITIONS_AHEAD = 3
+
+
+def month_partitions(first, last):
+    year, month = first.year, first.month
+    while (year, month) <= (last.year, last.month):
+        lower = datetime(year, month, 1, tzinfo=timezone.utc)
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        yield lower, datetime(year, month, 1, tzinfo=timezone.utc)
+
+
+def partition_results(apps, schema_editor):
+    """Move the result table to monthly range partitions of crawled_at.
+
+    Postgres requires the partition key in every unique constraint, so every
+    result is stamped with the creation date of its config, keeping links
+    unique per config.
+    """
+    execute = schema_editor.execute
+    # Free the names the partitioned table takes over
+    execute(f"ALTER TABLE {TABLE} RENAME TO {LEGACY}")
+    execute(f"ALTER TABLE {LEGACY} RENAME CONSTRAINT {TABLE}_pkey TO {LEGACY}_pkey")
+    execute(f"ALTER TABLE {LEGACY} DROP CONSTRAINT unique_search_result_link")
+    for index in ("crawled", "config", "domain", "fts"):
+        execute(f"DROP INDEX search_result_{index}_idx")
+    execute(f"ALTER TABLE {LEGACY} ALTER COLUMN id DROP IDENTITY")
+
+    execute(
+        f"CREATE TABLE {TABLE} (LIKE {LEGACY} INCLUDING DEFAULTS INCLUDING GENERATED) "
+        f"PARTITION BY RANGE (crawled_at)"
+    )
+    execute(f"CREATE SEQUENCE {TABLE}_id_seq OWNED BY {TABLE}.id")
+    execute(
+        f"ALTER TABLE {TABLE} ALTER COLUMN id SET DEFAULT nextval('{TABLE}_id_seq')"
+    )
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT min(created_at), now() FROM crawler_googlesearchconfig")
+        first, now = cursor.fetchone()
+    first = (first or now).astimezone(timezone.utc)
+    now = now.astimezone(timezone.utc)
+    index = now.year * 12 + now.month - 1 + PARTITIONS_AHEAD
+    last = datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+    for lower, upper in month_partitions(first, last):
+        execute(
+            f"CREATE TABLE {TABLE}_p{lower:%Y_%m} PARTITION OF {TABLE} "
+            f"FOR VALUES FROM (%s) TO (%s)",
+            [lower, upper],
+        )
+    # Safety net for rows outside every monthly partition, emptied when the
+    # partition of their month is created
+    execute(f"CREATE TABLE {TABLE}_default PARTITION OF {TABLE} DEFAULT")
+
+    execute(
+        f"INSERT INTO {TABLE} ({COLUMNS}) "
+        f"SELECT result.id, result.link, result.link_hash, result.domain, "
+        f"result.title, result.description, config.created_at, result.config_id "
+        f"FROM {LEGACY} AS result "
+        f"JOIN crawler_googlesearchconfig AS config ON config.id = result.config_id"
+    )
+    execute(
+        f"SELECT setval('{TABLE}_id_seq', "
+        f"(SELECT coalesce(max(id), 0) + 1 FROM {LEGACY}), false)"
+    )
+    execute(f"DROP TABLE {LEGACY}")
+
+    # Constraints and indexes are built once the rows are in, each partition
+    # gets its own. Deleting a config now cascades in the database.
+    execute(f"ALTER TABLE {TABLE} ADD PRIMARY KEY (id, crawled_at)")
+    execute(
+        f"ALTER TABLE {TABLE} ADD CONSTRAINT unique_search_result_link "
+        f"UNIQUE (config_id, link_hash, crawled_at)"
+    )
+    execute(
+        f"ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_config_id_fk "
+        f"FOREIGN KEY (config_id) REFERENCES crawler_googlesearchconfig (id) "
+        f"ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED"
+    )
+    for index, columns in (
+        ("crawled", "crawled_at DESC, id DESC"),
+        ("config", "config_id, crawled_at DESC, id DESC"),
+        ("domain", "domain, crawled_at DESC, id DESC"),
+    ):
+        execute(f"CREATE INDEX search_result_{index}_idx ON {TABLE} ({columns})")
+    execute(f"CREATE INDEX search_result_fts_idx ON {TABLE} USING gin (search_vector)")
+    execute(f"ANALYZE {TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crawler', '0009_search_result_summary'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(partition_results),
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='googlesearchresult',
+                    name='config',
+                    field=models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, related_name='search_results', to='crawler.googlesearchconfig'),
+                ),
+                migrations.RemoveConstraint(
+                    model_name='googlesearchresult',
+                    name='unique_search_result_link',
+                ),
+                migrations.AddConstraint(
+                    model_name='googlesearchresult',
+                    constraint=models.UniqueConstraint(fields=('config', 'link_hash', 'crawled_at'), name='unique_search_result_link'),
+                ),
+            ],
+        ),
+    ]
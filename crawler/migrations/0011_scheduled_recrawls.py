@@ -0,0 +1,54 @@
+# Generated by Django 5.1.6 on 2026-10-18 08:40
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crawler', '0010_partition_search_results'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='googlesearchconfig',
+            name='recrawl_interval',
+            field=models.DurationField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='googlesearchconfig',
+            name='next_crawl_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='googlesearchconfig',
+            name='last_crawled_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='googlesearchconfig',
+            index=models.Index(condition=models.Q(('recrawl_interval__isnull', False)), fields=['next_crawl_at'], name='search_config_recrawl_idx'),
+        ),
+        migrations.AddField(
+            model_name='googlesearchresult',
+            name='position',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='RankChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('link', models.URLField(max_length=2048)),
+                ('kind', models.CharField(choices=[('new', 'New'), ('dropped', 'Dropped'), ('moved', 'Moved')], max_length=8)),
+                ('position', models.PositiveIntegerField(blank=True, null=True)),
+                ('previous_position', models.PositiveIntegerField(blank=True, null=True)),
+                ('detected_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('config', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rank_changes', to='crawler.googlesearchconfig')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['config', '-detected_at', '-id'], name='rank_change_config_idx')],
+            },
+        ),
+    ]
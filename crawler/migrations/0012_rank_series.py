@@ -0,0 +1,30 @@
+# Generated by Django 5.1.6 on 2026-10-18 08:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crawler', '0011_scheduled_recrawls'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RankSeries',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=255)),
+                ('lang', models.CharField(blank=True, default='', max_length=4)),
+                ('region', models.CharField(blank=True, default='', max_length=4)),
+                ('link', models.URLField(max_length=2048)),
+                ('link_hash', models.CharField(max_length=64)),
+                ('position', models.PositiveIntegerField()),
+                ('changed_at', models.DateTimeField()),
+                ('observations', models.BinaryField()),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('term', 'lang', 'region', 'link_hash'), name='unique_rank_series_link')],
+            },
+        ),
+    ]
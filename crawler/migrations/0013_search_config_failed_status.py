@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-18 08:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crawler', '0012_rank_series'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='googlesearchconfig',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=16),
+        ),
+    ]
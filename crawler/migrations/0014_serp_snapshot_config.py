@@ -0,0 +1,19 @@
+# Generated by Django 5.1.6 on 2026-10-18 09:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crawler', '0013_search_config_failed_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='serpsnapshot',
+            name='config',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='snapshots', to='crawler.googlesearchconfig'),
+        ),
+    ]
@@ -1,28 +1,742 @@
-from django.db import models
+import struct
+import time
+from datetime import datetime
+from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import (
+    SearchHeadline,
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    SearchVectorField,
+)
+from django.db import connection, models, transaction
 from django.utils import timezone
 
+from config.django.metrics import metrics
+from .caching import invalidate_configs, invalidate_results
+from .utils import link_domain, link_hash
+
+
+# Text search configuration of the result search vector and of its queries
+SEARCH_CONFIG = "english"
+
+db_write_duration = metrics.histogram(
+    "crawler_db_write_duration_seconds",
+    "Seconds spent writing one batch of search results.",
+)
+db_rows_written = metrics.counter(
+    "crawler_db_rows_written_total", "Search results submitted to the database."
+)
+
+# Packed rank observation: seconds since the epoch and 1-based position, OFF_PAGE
+# when the link was not on the page. Read back as crawler.analytics.OBSERVATION_DTYPE.
+OBSERVATION = struct.Struct("<IH")
+# Position of a link that left the page, never a real position since positions
+# are 1-based, and the largest position an observation holds
+OFF_PAGE = 0
+MAX_OBSERVED_POSITION = 2**16 - 1
+
+
+class CrawlBatch(models.Model):
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Crawl batch {self.id}"
+
+    def progress(self) -> dict:
+        """Count the configs of the batch in each status.
+
+        Returns:
+            dict: Total number of configs and the number in each status.
+        """
+        counts = dict(
+            self.configs.order_by()
+            .values_list("status")
+            .annotate(count=models.Count("id"))
+        )
+        progress = {
+            status: counts.get(status, 0) for status in GoogleSearchConfig.Status.values
+        }
+        progress["total"] = sum(counts.values())
+        return progress
+
+
+class GoogleSearchConfigQuerySet(models.QuerySet):
+    """Queryset invalidating the cached API responses of the configs it writes."""
+
+    def bulk_create(self, objs, *args, **kwargs):
+        created = super().bulk_create(objs, *args, **kwargs)
+        invalidate_configs()
+        return created
+
+    def update(self, **kwargs):
+        updated = super().update(**kwargs)
+        invalidate_configs()
+        return updated
+
+    def delete(self):
+        config_ids = list(self.values_list("pk", flat=True))
+        deleted = super().delete()
+        invalidate_configs(*config_ids, cascade=True)
+        return deleted
+
 
 class GoogleSearchConfig(models.Model):
+    class Status(models.TextChoices):
+        PENDING = "pending"
+        RUNNING = "running"
+        COMPLETED = "completed"
+        FAILED = "failed"
+
+    batch = models.ForeignKey(
+        CrawlBatch,
+        related_name="configs",
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+    )
+    status = models.CharField(
+        max_length=16, choices=Status.choices, default=Status.PENDING
+    )
+    # Set on configs whose results come from an identical crawl already running
+    coalesced_into = models.ForeignKey(
+        "self",
+        related_name="coalesced",
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+    )
+    fingerprint = models.CharField(max_length=64, blank=True, editable=False)
     term = models.CharField(max_length=255)
     results = models.IntegerField()
     safe = models.CharField(max_length=30)
     lang = models.CharField(max_length=4, blank=True, null=True)
     region = models.CharField(max_length=4, blank=True, null=True)
+    cache_ttl = models.PositiveIntegerField(blank=True, null=True)
+    # Configs with an interval are crawled again by the beat scheduler, and only
+    # the changes since their previous crawl are stored
+    recrawl_interval = models.DurationField(blank=True, null=True)
+    next_crawl_at = models.DateTimeField(blank=True, null=True)
+    last_crawled_at = models.DateTimeField(blank=True, null=True)
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = GoogleSearchConfigQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["-created_at", "-id"], name="search_config_created_idx"
+            ),
+            models.Index(
+                fields=["term", "-created_at", "-id"], name="search_config_term_idx"
+            ),
+            models.Index(fields=["batch", "status"], name="search_config_batch_idx"),
+            models.Index(
+                fields=["next_crawl_at"],
+                name="search_config_recrawl_idx",
+                condition=models.Q(recrawl_interval__isnull=False),
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.recrawl_interval and self.next_crawl_at is None:
+            self.next_crawl_at = self.created_at + self.recrawl_interval
+        super().save(*args, **kwargs)
+        invalidate_configs()
+
+    def delete(self, *args, **kwargs):
+        config_id = self.pk
+        deleted = super().delete(*args, **kwargs)
+        invalidate_configs(config_id, cascade=True)
+        return deleted
+
     def __str__(self):
         return f"Google Search Configuration for {self.term}"
 
+    def get_cache_ttl(self) -> int:
+        """Seconds fetched pages stay cached, falling back to CRAWLER_CACHE_TTL."""
+        return settings.CRAWLER_CACHE_TTL if self.cache_ttl is None else self.cache_ttl
+
+
+def crawl_date(config_id) -> datetime:
+    """Return the date every result of a config is stored under."""
+    return GoogleSearchConfig.objects.values_list("created_at", flat=True).get(
+        pk=config_id
+    )
+
+
+class GoogleSearchResultQuerySet(models.QuerySet):
+    # Every write below refreshes the summaries and invalidates the cached API
+    # responses of the configs whose results change, persist and copy_to go
+    # through bulk_create
+
+    def bulk_create(self, objs, *args, **kwargs):
+        created = super().bulk_create(objs, *args, **kwargs)
+        self._results_changed({result.config_id for result in created})
+        return created
+
+    def update(self, **kwargs):
+        config_ids = set(self.values_list("config_id", flat=True).distinct())
+        updated = super().update(**kwargs)
+        self._results_changed(config_ids)
+        return updated
+
+    def delete(self):
+        config_ids = set(self.values_list("config_id", flat=True).distinct())
+        deleted = super().delete()
+        self._results_changed(config_ids)
+        return deleted
+
+    def _results_changed(self, config_ids):
+        GoogleSearchResultSummary.objects.refresh(config_ids)
+        invalidate_results(*config_ids)
+
+    def for_config(self, config):
+        """Filter the results of a config, reading only the partition holding them.
+
+        Args:
+            config (GoogleSearchConfig): Config whose results are selected
+
+        Returns:
+            QuerySet: Results of the config.
+        """
+        return self.filter(config=config, crawled_at=config.created_at)
+
+    def persist(self, config_id, results, batch_size=None, update=False):
+        """Insert parsed results for a config in batches inside one transaction.
+
+        Links already stored for the config are skipped by the database, so
+        persisting the same results twice is a no-op. With `update` their title
+        and description are overwritten instead. Every result of a config is
+        stamped with the config creation date, see GoogleSearchResult.
+
+        Args:
+            config_id (int): Primary key of the GoogleSearchConfig
+            results (list): Parsed results with link, title and description keys
+            batch_size (int): Number of rows per INSERT statement (optional)
+            update (bool): Overwrite the stored results of the same links (optional)
+
+        Returns:
+            int: Number of results submitted.
+        """
+        crawled_at = crawl_date(config_id)
+        rows = [
+            self.model(
+                config_id=config_id,
+                crawled_at=crawled_at,
+                link=result["link"],
+                link_hash=link_hash(result["link"]),
+                domain=link_domain(result["link"])[:255],
+                title=(result["title"] or "")[:255],
+                description=result["description"],
+                position=result.get("position"),
+            )
+            for result in results
+        ]
+        started = time.perf_counter()
+        with transaction.atomic():
+            if update:
+                self.bulk_create(
+                    rows,
+                    batch_size=batch_size or settings.CRAWLER_PERSIST_BATCH_SIZE,
+                    update_conflicts=True,
+                    unique_fields=["config", "link_hash", "crawled_at"],
+                    update_fields=["link", "title", "description", "position"],
+                )
+            else:
+                self.bulk_create(
+                    rows,
+                    batch_size=batch_size or settings.CRAWLER_PERSIST_BATCH_SIZE,
+                    ignore_conflicts=True,
+                )
+        db_write_duration.observe(time.perf_counter() - started)
+        db_rows_written.inc(len(rows))
+        return len(rows)
+
+    def search(self, text):
+        """Rank the results matching a web search style query, best first.
+
+        Args:
+            text (str): Query, supporting "quoted phrases", OR and -exclusions
+
+        Returns:
+            QuerySet: Matching results annotated with `rank` and a `headline`
+            snippet of the description with the matched words in <mark> tags.
+        """
+        query = SearchQuery(text, search_type="websearch", config=SEARCH_CONFIG)
+        return (
+            self.filter(search_vector=query)
+            .annotate(
+                rank=SearchRank(models.F("search_vector"), query),
+                headline=SearchHeadline(
+                    "description",
+                    query,
+                    config=SEARCH_CONFIG,
+                    start_sel="<mark>",
+                    stop_sel="</mark>",
+                    max_fragments=2,
+                ),
+            )
+            .order_by("-rank", "-crawled_at", "-id")
+        )
+
+    def copy_to(self, config_id, batch_size=None):
+        """Insert a copy of the results of the queryset for another config.
+
+        Links the config already holds are skipped, so copying twice is a no-op.
+
+        Args:
+            config_id (int): Primary key of the GoogleSearchConfig receiving the copy
+            batch_size (int): Number of rows per INSERT statement (optional)
+
+        Returns:
+            int: Number of results submitted.
+        """
+        batch_size = batch_size or settings.CRAWLER_PERSIST_BATCH_SIZE
+        crawled_at = crawl_date(config_id)
+        fields = ("link", "link_hash", "domain", "title", "description", "position")
+        rows = [
+            self.model(
+                config_id=config_id, crawled_at=crawled_at, **dict(zip(fields, values))
+            )
+            for values in self.values_list(*fields).iterator(chunk_size=batch_size)
+        ]
+        with transaction.atomic():
+            self.model.objects.bulk_create(
+                rows, batch_size=batch_size, ignore_conflicts=True
+            )
+        db_rows_written.inc(len(rows))
+        return len(rows)
+
+    def record_snapshot(self, config_id, results, batch_size=None) -> list:
+        """Store a new SERP of a config as its changes since the previous one.
+
+        Only links entering the page are inserted, and only results whose
+        position changed are updated. Links gone from the page keep their row
+        with a null position. A RankChange is written for every change, so
+        storage grows with the changes and not with the number of crawls.
+
+        Args:
+            config_id (int): Primary key of the GoogleSearchConfig
+            results (list): Parsed results with link, title, description and position
+            batch_size (int): Number of rows per statement (optional)
+
+        Returns:
+            list: RankChange rows written.
+        """
+        batch_size = batch_size or settings.CRAWLER_PERSIST_BATCH_SIZE
+        crawled_at = crawl_date(config_id)
+        current = self.filter(config_id=config_id, crawled_at=crawled_at)
+        stored = {
+            row_hash: (pk, link, position)
+            for pk, row_hash, link, position in current.values_list(
+                "id", "link_hash", "link", "position"
+            )
+        }
+        seen = {}
+        for result in results:
+            seen.setdefault(link_hash(result["link"]), result)
+
+        changes, new_rows, moved, dropped = [], [], [], []
+        for result_hash, result in seen.items():
+            position = result.get("position")
+            if result_hash not in stored:
+                new_rows.append(
+                    self.model(
+                        config_id=config_id,
+                        crawled_at=crawled_at,
+                        link=result["link"],
+                        link_hash=result_hash,
+                        domain=link_domain(result["link"])[:255],
+                        title=(result["title"] or "")[:255],
+                        description=result["description"],
+                        position=position,
+                    )
+                )
+                kind, previous = RankChange.Kind.NEW, None
+            else:
+                pk, _, previous = stored[result_hash]
+                if previous == position:
+                    continue
+                moved.append(self.model(id=pk, position=position))
+                kind = (
+                    RankChange.Kind.NEW if previous is None else RankChange.Kind.MOVED
+                )
+            changes.append(
+                RankChange(
+                    config_id=config_id,
+                    link=result["link"],
+                    kind=kind,
+                    position=position,
+                    previous_position=previous,
+                )
+            )
+        for result_hash, (pk, link, previous) in stored.items():
+            if previous is not None and result_hash not in seen:
+                dropped.append(pk)
+                changes.append(
+                    RankChange(
+                        config_id=config_id,
+                        link=link,
+                        kind=RankChange.Kind.DROPPED,
+                        previous_position=previous,
+                    )
+                )
+
+        started = time.perf_counter()
+        with transaction.atomic():
+            if new_rows:
+                self.bulk_create(new_rows, batch_size=batch_size, ignore_conflicts=True)
+            if moved:
+                current.bulk_update(moved, ["position"], batch_size=batch_size)
+            if dropped:
+                current.filter(id__in=dropped).update(position=None)
+            RankChange.objects.bulk_create(changes, batch_size=batch_size)
+        db_write_duration.observe(time.perf_counter() - started)
+        db_rows_written.inc(len(new_rows))
+        return changes
+
 
 class GoogleSearchResult(models.Model):
+    """Search result, stored in a table partitioned by month of `crawled_at`.
+
+    The partition key has to be part of every unique constraint, so all the
+    results of a config share one `crawled_at`, the config creation date, and
+    links stay unique per config. `crawled_at` is therefore not when a result
+    was fetched: results of later re-crawls keep it too, and the config's
+    `last_crawled_at` tells when its page was last fetched. Filtering or
+    ordering results on it goes by the creation date of their config.
+
+    Deleting a config leaves its results to the ON DELETE CASCADE of the
+    database foreign key.
+    """
+
     config = models.ForeignKey(
-        GoogleSearchConfig, related_name="search_results", on_delete=models.CASCADE
+        GoogleSearchConfig, related_name="search_results", on_delete=models.DO_NOTHING
     )
-    link = models.URLField()
+    link = models.URLField(max_length=2048)
+    link_hash = models.CharField(max_length=64, editable=False)
+    domain = models.CharField(max_length=255, editable=False)
     title = models.CharField(max_length=255, blank=True, null=True)
     description = models.TextField()
+    # Creation date of the config, see above, set by save() and persist()
     crawled_at = models.DateTimeField(default=timezone.now)
+    # 1-based rank on the result page, null once the link left the page
+    position = models.PositiveIntegerField(blank=True, null=True)
+    # Computed by Postgres on every insert or update, titles weigh more
+    search_vector = models.GeneratedField(
+        expression=SearchVector("title", weight="A", config=SEARCH_CONFIG)
+        + SearchVector("description", weight="B", config=SEARCH_CONFIG),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+
+    objects = GoogleSearchResultQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["config", "link_hash", "crawled_at"],
+                name="unique_search_result_link",
+            )
+        ]
+        # Each index ends with the cursor ordering so that filtered pages are
+        # read straight from the index, whatever their depth
+        indexes = [
+            models.Index(
+                fields=["-crawled_at", "-id"], name="search_result_crawled_idx"
+            ),
+            models.Index(
+                fields=["config", "-crawled_at", "-id"], name="search_result_config_idx"
+            ),
+            models.Index(
+                fields=["domain", "-crawled_at", "-id"], name="search_result_domain_idx"
+            ),
+            GinIndex(fields=["search_vector"], name="search_result_fts_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.link_hash = link_hash(self.link)
+        self.domain = link_domain(self.link)[:255]
+        if self._state.adding:
+            self.crawled_at = crawl_date(self.config_id)
+        super().save(*args, **kwargs)
+        GoogleSearchResult.objects._results_changed({self.config_id})
+
+    def delete(self, *args, **kwargs):
+        config_id = self.config_id
+        deleted = super().delete(*args, **kwargs)
+        GoogleSearchResult.objects._results_changed({config_id})
+        return deleted
 
     def __str__(self):
         return f"Result for {self.config.term} - [{self.title}] {self.link}"
+
+
+class RankChange(models.Model):
+    """Change of a link on the result page of a config between two crawls."""
+
+    class Kind(models.TextChoices):
+        NEW = "new"
+        DROPPED = "dropped"
+        MOVED = "moved"
+
+    config = models.ForeignKey(
+        GoogleSearchConfig, related_name="rank_changes", on_delete=models.CASCADE
+    )
+    link = models.URLField(max_length=2048)
+    kind = models.CharField(max_length=8, choices=Kind.choices)
+    # Null for dropped links
+    position = models.PositiveIntegerField(blank=True, null=True)
+    # Null for new links
+    previous_position = models.PositiveIntegerField(blank=True, null=True)
+    detected_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["config", "-detected_at", "-id"], name="rank_change_config_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.link}: {self.previous_position} -> {self.position}"
+
+
+class GoogleSearchResultSummaryQuerySet(models.QuerySet):
+    def refresh(self, config_ids):
+        """Recompute the summaries of the configs from their stored results.
+
+        Each config is aggregated through the config index, and every summary
+        is written in a single upsert, so the cost depends on the size of the
+        configs and not of the table.
+
+        The summaries are locked before the results are counted and until the
+        surrounding transaction commits. Concurrent writers of a config, such
+        as the pages of a streamed crawl, thus count one after the other and
+        the last one to commit sees the rows of all the others.
+
+        Args:
+            config_ids (Iterable): Primary keys of the GoogleSearchConfig to refresh
+
+        Returns:
+            int: Number of summaries written.
+        """
+        config_ids = sorted(set(config_ids))
+        if not config_ids:
+            return 0
+        with transaction.atomic():
+            # Missing summaries are created first so there is a row to lock,
+            # rows are taken in config order so that writers never deadlock
+            self.bulk_create(
+                [self.model(config_id=config_id) for config_id in config_ids],
+                ignore_conflicts=True,
+            )
+            list(
+                self.filter(config_id__in=config_ids)
+                .order_by("config_id")
+                .select_for_update()
+                .values_list("config_id", flat=True)
+            )
+            stats = {
+                row.pop("config_id"): row
+                for row in GoogleSearchResult.objects.filter(config_id__in=config_ids)
+                .values("config_id")
+                .order_by()
+                .annotate(
+                    result_count=models.Count("id"),
+                    domain_count=models.Count("domain", distinct=True),
+                    latest_crawled_at=models.Max("crawled_at"),
+                )
+            }
+            summaries = [
+                self.model(config_id=config_id, **stats.get(config_id, {}))
+                for config_id in config_ids
+            ]
+            self.bulk_create(
+                summaries,
+                update_conflicts=True,
+                unique_fields=["config"],
+                update_fields=[
+                    "result_count",
+                    "domain_count",
+                    "latest_crawled_at",
+                    "updated_at",
+                ],
+            )
+        # Summaries are part of the config responses
+        invalidate_configs()
+        return len(summaries)
+
+
+class GoogleSearchResultSummary(models.Model):
+    """Result statistics of a config, refreshed whenever its results change."""
+
+    config = models.OneToOneField(
+        GoogleSearchConfig,
+        related_name="summary",
+        on_delete=models.CASCADE,
+        primary_key=True,
+    )
+    result_count = models.PositiveIntegerField(default=0)
+    domain_count = models.PositiveIntegerField(default=0)
+    # Largest crawled_at of the results, the creation date of the config
+    latest_crawled_at = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = GoogleSearchResultSummaryQuerySet.as_manager()
+
+    def __str__(self):
+        return f"Summary of config {self.config_id}: {self.result_count} results"
+
+
+class RankSeriesQuerySet(models.QuerySet):
+    def observe(self, term, lang, region, positions, at=None, depth=None) -> int:
+        """Append the positions seen by a crawl to the rank series of its query.
+
+        Series are step functions: an observation is only appended when the
+        position of a link differs from its last one, in a single upsert per
+        batch, so unchanged links cost no write.
+
+        Args:
+            term (str): Search term
+            lang (str): Language of the search, or None
+            region (str): Region of the search, or None
+            positions (dict): 1-based position of the links on the page, by link.
+                Links without a position, or past MAX_OBSERVED_POSITION, are
+                not observed
+            at (datetime): Date of the crawl, defaults to now (optional)
+            depth (int): Number of positions crawled, links last seen within it
+                and missing from `positions` are recorded as gone, at position
+                OFF_PAGE (optional)
+
+        Returns:
+            int: Number of series appended to.
+        """
+        lang, region = lang or "", region or ""
+        at = at or timezone.now()
+        observed = {
+            link_hash(link): (link, position)
+            for link, position in positions.items()
+            # A position of 0 would read as OFF_PAGE
+            if position and position <= MAX_OBSERVED_POSITION
+        }
+        if depth:
+            gone = (
+                self.filter(
+                    term=term,
+                    lang=lang,
+                    region=region,
+                    position__gt=OFF_PAGE,
+                    position__lte=depth,
+                )
+                .exclude(link_hash__in=observed)
+                .values_list("link_hash", "link")
+            )
+            observed.update({row_hash: (link, OFF_PAGE) for row_hash, link in gone})
+
+        timestamp = int(at.timestamp())
+        rows = [
+            (
+                term,
+                lang,
+                region,
+                link,
+                row_hash,
+                position,
+                at,
+                OBSERVATION.pack(timestamp, position),
+            )
+            for row_hash, (link, position) in observed.items()
+        ]
+        table = self.model._meta.db_table
+        appended = 0
+        batch_size = settings.CRAWLER_PERSIST_BATCH_SIZE
+        with transaction.atomic(), connection.cursor() as cursor:
+            for offset in range(0, len(rows), batch_size):
+                batch = rows[offset : offset + batch_size]
+                cursor.execute(
+                    f"INSERT INTO {table} (term, lang, region, link, link_hash, "
+                    f"position, changed_at, observations) VALUES "
+                    + ", ".join(["(%s, %s, %s, %s, %s, %s, %s, %s)"] * len(batch))
+                    + f" ON CONFLICT (term, lang, region, link_hash) DO UPDATE SET "
+                    f"position = EXCLUDED.position, "
+                    f"changed_at = EXCLUDED.changed_at, "
+                    f"observations = {table}.observations || EXCLUDED.observations "
+                    f"WHERE {table}.position <> EXCLUDED.position",
+                    [value for row in batch for value in row],
+                )
+                appended += cursor.rowcount
+        return appended
+
+
+class RankSeries(models.Model):
+    """Rank history of a link for a query, packed as OBSERVATION records.
+
+    One row per (term, lang, region, link) whatever the number of crawls, with
+    the observations in a single binary value that analytics read as a numpy
+    array without building any Python object per observation.
+    """
+
+    term = models.CharField(max_length=255)
+    lang = models.CharField(max_length=4, blank=True, default="")
+    region = models.CharField(max_length=4, blank=True, default="")
+    link = models.URLField(max_length=2048)
+    link_hash = models.CharField(max_length=64)
+    # Last observed position and when it changed, OFF_PAGE once the link left the page
+    position = models.PositiveIntegerField()
+    changed_at = models.DateTimeField()
+    observations = models.BinaryField()
+
+    objects = RankSeriesQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["term", "lang", "region", "link_hash"],
+                name="unique_rank_series_link",
+            )
+        ]
+
+    def __str__(self):
+        return f"Rank series of {self.link} for {self.term}"
+
+
+class SerpSnapshot(models.Model):
+    """Index entry locating a fetched result page in the SERP segment archive."""
+
+    # Config the page was fetched for, null for pages archived before it was kept
+    config = models.ForeignKey(
+        GoogleSearchConfig,
+        related_name="snapshots",
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+    )
+    term = models.CharField(max_length=255)
+    start = models.PositiveIntegerField()
+    safe = models.CharField(max_length=30)
+    lang = models.CharField(max_length=4, blank=True, null=True)
+    region = models.CharField(max_length=4, blank=True, null=True)
+    fetched_at = models.DateTimeField(default=timezone.now)
+    content_hash = models.CharField(max_length=64)
+    segment = models.CharField(max_length=255)
+    offset = models.BigIntegerField()
+    length = models.PositiveIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["term", "lang", "region", "-fetched_at"],
+                name="serp_snapshot_term_idx",
+            ),
+            models.Index(fields=["content_hash"], name="serp_snapshot_hash_idx"),
+            models.Index(
+                fields=["segment", "offset"], name="serp_snapshot_location_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"Snapshot of {self.term} at {self.start} - {self.fetched_at}"
@@ -0,0 +1,149 @@
+import json
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import models
+from django.db.models.lookups import GreaterThan, LessThan
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+
+
+class Row(models.Func):
+    """Row value of expressions, compared to another row column by column."""
+
+    template = "(%(expressions)s)"
+    output_field = models.Field()
+
+
+class KeysetCursorPagination(CursorPagination):
+    """Keyset pagination seeking on every field of the ordering at once.
+
+    DRF's CursorPagination seeks on the first ordering field only and skips
+    the rows sharing its value with an OFFSET, which gets slower with every
+    page and fails past `offset_cutoff` when many rows share it, as all the
+    results of a config share their crawled_at. Here the cursor holds the
+    value of every ordering field of the last row, and the next page starts
+    right after that row with a single row comparison, such as
+    "(crawled_at, id) < (%s, %s)", that the matching index turns into a range
+    scan. Every page is thus read without COUNT(*) nor OFFSET.
+
+    The ordering must end with a unique field and sort every field in the same
+    direction.
+    """
+
+    page_size_query_param = "page_size"
+
+    @property
+    def max_page_size(self):
+        return settings.API_MAX_PAGE_SIZE
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        assert len({field.startswith("-") for field in ordering}) == 1, (
+            "Keyset pagination needs every ordering field sorted in the same "
+            f"direction, got {ordering}"
+        )
+        return ordering
+
+    def _field_names(self, ordering) -> list:
+        return [field.lstrip("-") for field in ordering]
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = [
+            instance[name] if isinstance(instance, dict) else getattr(instance, name)
+            for name in self._field_names(ordering)
+        ]
+        return json.dumps([str(value) for value in values])
+
+    def _seek(self, queryset, position, before: bool):
+        """Keep the rows strictly before or after a position in the ordering fields."""
+        names = self._field_names(self.ordering)
+        try:
+            values = json.loads(position)
+            if not isinstance(values, list) or len(values) != len(names):
+                raise ValueError(position)
+            fields = [queryset.model._meta.get_field(name) for name in names]
+            values = [
+                models.Value(field.to_python(value), output_field=field)
+                for field, value in zip(fields, values)
+            ]
+        except (ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        lookup = LessThan if before else GreaterThan
+        return queryset.filter(lookup(Row(*names), Row(*values)))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (offset, reverse, current_position) = (0, False, None)
+        else:
+            (offset, reverse, current_position) = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by(
+                *(
+                    field[1:] if field.startswith("-") else f"-{field}"
+                    for field in self.ordering
+                )
+            )
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if current_position is not None:
+            # Rows before the position in a descending ordering read forward,
+            # or in an ascending ordering read backward
+            before = reverse != self.ordering[0].startswith("-")
+            queryset = self._seek(queryset, current_position, before)
+
+        # One extra row tells whether a page follows, positions are unique so
+        # links never need an offset
+        results = list(queryset[offset : offset + self.page_size + 1])
+        self.page = results[: self.page_size]
+        has_following_position = len(results) > len(self.page)
+        following_position = (
+            self._get_position_from_instance(results[-1], self.ordering)
+            if has_following_position
+            else None
+        )
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = current_position is not None or offset > 0
+            self.has_previous = has_following_position
+            self.next_position = current_position
+            self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = current_position is not None or offset > 0
+            self.next_position = following_position
+            self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+
+class CrawledAtCursorPagination(KeysetCursorPagination):
+    """Keyset pagination over results, newest first."""
+
+    ordering = ("-crawled_at", "-id")
+
+
+class CreatedAtCursorPagination(KeysetCursorPagination):
+    """Keyset pagination over search configurations, newest first."""
+
+    ordering = ("-created_at", "-id")
+
+
+class DetectedAtCursorPagination(KeysetCursorPagination):
+    """Keyset pagination over rank changes, newest first."""
+
+    ordering = ("-detected_at", "-id")
@@ -0,0 +1,314 @@
+import re
+from html import unescape
+from urllib.parse import unquote
+
+from django.conf import settings
+
+
+RESULT_BLOCK_CLASS = "ezO2md"
+TITLE_CLASS = "CVA68e"
+DESCRIPTION_CLASS = "FrIlee"
+
+
+def clean_link(href: str) -> str:
+    """Turn a Google redirect href into the target URL."""
+    return unquote(href.split("&")[0].replace("/url?q=", ""))
+
+
+def number_results(results: list, start: int) -> list:
+    """Set the 1-based SERP `position` of the parsed results of a page starting at `start`."""
+    for position, result in enumerate(results, start + 1):
+        result["position"] = position
+    return results
+
+
+class SerpParser:
+    """Interface of the engines turning a Google result page into result dicts.
+
+    Every engine must yield the same results, in the same order, as
+    SoupSerpParser which is kept as the reference implementation.
+    """
+
+    name = None
+
+    def parse(self, html: str):
+        """Yield a dict with link, title and description for every result block.
+
+        Args:
+            html (str): Raw HTML of a Google result page
+        """
+        raise NotImplementedError
+
+
+class SoupSerpParser(SerpParser):
+    """Reference engine building a full BeautifulSoup tree."""
+
+    name = "soup"
+
+    def parse(self, html: str):
+        # Imported here, processes that never parse with it skip loading bs4
+        from bs4 import BeautifulSoup
+
+        soup = BeautifulSoup(html, "html.parser")
+        result_block = soup.find_all("div", class_=RESULT_BLOCK_CLASS)
+        for result in result_block:
+            link_tag = result.find("a", href=True)
+            title_tag = link_tag.find("span", class_=TITLE_CLASS) if link_tag else None
+            description_tag = result.find("span", class_=DESCRIPTION_CLASS)
+
+            if link_tag and title_tag and description_tag:
+                link = clean_link(link_tag["href"])
+                title = title_tag.text if title_tag else ""
+                description = description_tag.text if description_tag else ""
+                yield {"link": link, "title": title, "description": description}
+
+
+class _ResultBlock:
+    __slots__ = ("href", "link_entry", "title", "description")
+
+    def __init__(self):
+        self.href = None
+        self.link_entry = None
+        self.title = None
+        self.description = None
+
+
+class _SerpEventHandler:
+    """Collect result blocks from markup events without building a document tree.
+
+    Only a stack of open tag names is kept. It is maintained the same way
+    BeautifulSoup's html.parser tree builder nests elements: void elements are
+    closed as soon as they open, and an end tag closes every element above the
+    most recent open element of that name, or is ignored when there is none.
+    Text is only kept for the title and description spans currently being read.
+
+    Like BeautifulSoup, consecutive text is buffered and only turned into a
+    string at the next tag, comment or declaration. Markup that produces no
+    event, an ignored void end tag such as "</br>" or "</>", therefore does
+    not split the string, which matters to whitespace-only strings.
+    """
+
+    VOID_ELEMENTS = frozenset(
+        {
+            "area", "base", "basefont", "bgsound", "br", "col", "command",
+            "embed", "frame", "hr", "image", "img", "input", "isindex",
+            "keygen", "link", "menuitem", "meta", "nextid", "param", "source",
+            "spacer", "track", "wbr",
+        }
+    )  # fmt: skip
+    # BeautifulSoup leaves the text of these elements out of `.text`
+    HIDDEN_TEXT_ELEMENTS = frozenset({"script", "style", "template", "rp", "rt"})
+    PRESERVE_WHITESPACE_ELEMENTS = frozenset({"pre", "textarea"})
+    ASCII_SPACES = str.maketrans("", "", "\x20\x0a\x09\x0c\x0d")
+
+    def __init__(self):
+        self.blocks = []
+        # Each entry is [tag name, result block opened here, text buffers closed with it]
+        self.stack = []
+        self.open_tags = {}
+        self.open_blocks = []
+        self.captures = []
+        self.already_closed = []
+        self.pending = []
+
+    def _pop(self):
+        entry = self.stack.pop()
+        self.open_tags[entry[0]] -= 1
+        if entry[1] is not None:
+            self.open_blocks.remove(entry[1])
+        if entry[2]:
+            self.captures = [
+                capture
+                for capture in self.captures
+                if not any(capture is closed for closed in entry[2])
+            ]
+        for block in self.open_blocks:
+            if block.link_entry is entry:
+                block.link_entry = None
+
+    def start(self, tag, attributes, handle_empty_element=True):
+        self.flush()
+        entry = [tag, None, []]
+        if tag == "a" and "href" in attributes:
+            for block in self.open_blocks:
+                if block.href is None:
+                    block.href = attributes["href"]
+                    block.link_entry = entry
+        elif tag == "span":
+            classes = attributes.get("class", "").split()
+            for block in self.open_blocks:
+                if (
+                    TITLE_CLASS in classes
+                    and block.link_entry is not None
+                    and block.title is None
+                ):
+                    block.title = []
+                    entry[2].append(block.title)
+                if DESCRIPTION_CLASS in classes and block.description is None:
+                    block.description = []
+                    entry[2].append(block.description)
+        elif tag == "div" and RESULT_BLOCK_CLASS in attributes.get("class", "").split():
+            entry[1] = _ResultBlock()
+            self.blocks.append(entry[1])
+
+        self.stack.append(entry)
+        self.open_tags[tag] = self.open_tags.get(tag, 0) + 1
+        if entry[1] is not None:
+            self.open_blocks.append(entry[1])
+        self.captures.extend(entry[2])
+
+        if handle_empty_element and tag in self.VOID_ELEMENTS:
+            # Void elements are closed right away, and their explicit end tag
+            # (if any) is ignored once
+            self.end(tag, check_already_closed=False)
+            self.already_closed.append(tag)
+
+    def end(self, tag, check_already_closed=True):
+        if check_already_closed and tag in self.already_closed:
+            self.already_closed.remove(tag)
+            return
+        self.flush()
+        if not self.open_tags.get(tag):
+            return
+        while self.stack:
+            popped = self.stack[-1][0]
+            self._pop()
+            if popped == tag:
+                break
+
+    def text(self, text):
+        self.pending.append(text)
+
+    def flush(self):
+        """End the buffered string, as BeautifulSoup does at every other event."""
+        if not self.pending:
+            return
+        text = "".join(self.pending)
+        self.pending.clear()
+        if "&" in text:
+            text = unescape(text)
+        if not text.translate(self.ASCII_SPACES) and not any(
+            self.open_tags.get(tag) for tag in self.PRESERVE_WHITESPACE_ELEMENTS
+        ):
+            text = "\n" if "\n" in text else " "
+        if any(self.open_tags.get(tag) for tag in self.HIDDEN_TEXT_ELEMENTS):
+            return
+        for capture in self.captures:
+            capture.append(text)
+
+    def close(self):
+        self.flush()
+        while self.stack:
+            self._pop()
+
+
+class StreamingSerpParser(SerpParser):
+    """Fast engine reading the page as a stream of markup events.
+
+    Markup is tokenized with a single compiled expression following the
+    tokenization rules of `html.parser`. Attributes are only decoded for the
+    tags that matter, text is only sliced out while a title or description is
+    being read, and no document tree is ever built.
+    """
+
+    name = "streaming"
+
+    MARKUP_RE = re.compile(
+        r"""<!--.*?(?:--!?>|\Z)"""
+        r"""|<![^>]*>?"""
+        r"""|<\?[^>]*>?"""
+        r"""|</[a-zA-Z][^>]*>"""
+        r"""|</(?:[^a-zA-Z>][^>]*)?>"""
+        r"""|<[a-zA-Z][^\t\n\r\f />\x00]*(?:"[^"]*"|'[^']*'|[^'">])*>""",
+        re.S,
+    )
+    # End tags html.parser reads strictly first, spaces allowed around the name
+    END_TAG_RE = re.compile(r"</\s*([a-zA-Z][-.a-zA-Z0-9:_]*)\s*>")
+    TAG_NAME_RE = re.compile(r"</?([a-zA-Z][^\t\n\r\f />\x00]*)(?:\s|/(?!>))*")
+    ATTRIBUTE_RE = re.compile(
+        r"""((?<=[\'"\s/])[^\s/>][^\s/=>]*)(\s*=+\s*"""
+        r"""(\'[^\']*\'|"[^"]*"|(?![\'"])[^>\s]*))?(?:\s|/(?!>))*"""
+    )
+    RAW_TEXT_END_RE = {
+        tag: re.compile(rf"</{tag}[\t\n\r\f />]", re.I) for tag in ("script", "style")
+    }
+    ATTRIBUTE_TAGS = frozenset({"a", "span", "div"})
+
+    def _attributes(self, markup: str, position: int) -> dict:
+        attributes = {}
+        end = len(markup) - 1
+        while position < end:
+            match = self.ATTRIBUTE_RE.match(markup, position)
+            if not match:
+                break
+            name, assignment, value = match.groups()
+            if not assignment:
+                value = ""
+            elif value[:1] in ("'", '"') and value[:1] == value[-1:]:
+                value = value[1:-1]
+            attributes[name.lower()] = unescape(value) if "&" in value else value
+            position = match.end()
+        return attributes
+
+    def _events(self, html: str, handler):
+        position = 0
+        end = len(html)
+        while position < end:
+            match = self.MARKUP_RE.search(html, position)
+            if match is None:
+                if handler.captures:
+                    handler.text(html[position:])
+                break
+            if match.start() > position and handler.captures:
+                handler.text(html[position : match.start()])
+            markup = match.group()
+            position = match.end()
+            if markup[1] == "/":
+                # Like html.parser, "</ br>" ends a br, "</>" is dropped, and
+                # other end tags not starting with a letter are bogus comments
+                name = self.END_TAG_RE.match(markup) or self.TAG_NAME_RE.match(markup)
+                if name is not None:
+                    handler.end(name.group(1).lower())
+                elif markup != "</>":
+                    handler.flush()
+            elif markup[1] in "!?":
+                # Comments and declarations end the current string
+                handler.flush()
+            else:
+                name = self.TAG_NAME_RE.match(markup)
+                tag = name.group(1).lower()
+                attributes = (
+                    self._attributes(markup, name.end())
+                    if tag in self.ATTRIBUTE_TAGS
+                    else {}
+                )
+                if markup.endswith("/>"):
+                    handler.start(tag, attributes, handle_empty_element=False)
+                    handler.end(tag)
+                    continue
+                handler.start(tag, attributes)
+                if tag in self.RAW_TEXT_END_RE:
+                    # Script and style bodies are never markup, skip to their end tag
+                    close = self.RAW_TEXT_END_RE[tag].search(html, position)
+                    position = close.start() if close else end
+
+    def parse(self, html: str):
+        handler = _SerpEventHandler()
+        self._events(html, handler)
+        handler.close()
+        for block in handler.blocks:
+            if block.href is None or block.title is None or block.description is None:
+                continue
+            yield {
+                "link": clean_link(block.href),
+                "title": "".join(block.title),
+                "description": "".join(block.description),
+            }
+
+
+PARSERS = {parser.name: parser for parser in (SoupSerpParser, StreamingSerpParser)}
+
+
+def get_parser(name: str = None) -> SerpParser:
+    """Return an instance of the named engine, defaulting to CRAWLER_SERP_PARSER."""
+    return PARSERS[name or settings.CRAWLER_SERP_PARSER]()
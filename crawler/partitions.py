@@ -0,0 +1,190 @@
+import logging
+import re
+from datetime import datetime, timezone as dt_timezone
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .caching import invalidate_configs
+from .models import GoogleSearchResult
+
+
+logger = logging.getLogger(__name__)
+
+TABLE = "crawler_googlesearchresult"
+DEFAULT_PARTITION = f"{TABLE}_default"
+PARTITION_RE = re.compile(rf"^{TABLE}_p(\d{{4}})_(\d{{2}})$")
+
+
+def result_columns() -> str:
+    """Return every column of the result table but the generated ones.
+
+    Read from the model so that rows moved between partitions never lose a
+    column added later. Generated columns are computed by the partition itself.
+    """
+    return ", ".join(
+        field.column
+        for field in GoogleSearchResult._meta.concrete_fields
+        if not field.generated
+    )
+
+
+def month_start(moment: datetime) -> datetime:
+    """Return the first instant of the UTC month of a date."""
+    moment = moment.astimezone(dt_timezone.utc)
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(month: datetime) -> str:
+    return f"{TABLE}_p{month:%Y_%m}"
+
+
+def result_partitions() -> dict:
+    """Return the monthly partitions attached to the result table, by month start."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "WHERE parent.relname = %s",
+            [TABLE],
+        )
+        names = [name for name, in cursor.fetchall()]
+    partitions = {}
+    for name in names:
+        match = PARTITION_RE.match(name)
+        if match:
+            month = datetime(
+                int(match.group(1)), int(match.group(2)), 1, tzinfo=dt_timezone.utc
+            )
+            partitions[month] = name
+    return partitions
+
+
+def create_result_partition(month: datetime) -> str:
+    """Create the partition holding the results of one month.
+
+    Results that landed in the default partition while the month had no
+    partition are moved into the new one before it is attached.
+
+    Args:
+        month (datetime): Any date of the month
+
+    Returns:
+        str: Name of the partition.
+    """
+    lower = month_start(month)
+    upper = add_months(lower, 1)
+    name = partition_name(lower)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} "
+            f"WHERE crawled_at >= %s AND crawled_at < %s)",
+            [lower, upper],
+        )
+        if not cursor.fetchone()[0]:
+            cursor.execute(
+                f"CREATE TABLE {name} PARTITION OF {TABLE} "
+                f"FOR VALUES FROM (%s) TO (%s)",
+                [lower, upper],
+            )
+            return name
+        logger.info(f"Moving results of {lower:%Y-%m} out of {DEFAULT_PARTITION}")
+        cursor.execute(
+            f"CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS INCLUDING GENERATED)"
+        )
+        columns = result_columns()
+        cursor.execute(
+            f"INSERT INTO {name} ({columns}) SELECT {columns} FROM {DEFAULT_PARTITION} "
+            f"WHERE crawled_at >= %s AND crawled_at < %s",
+            [lower, upper],
+        )
+        cursor.execute(
+            f"DELETE FROM {DEFAULT_PARTITION} WHERE crawled_at >= %s AND crawled_at < %s",
+            [lower, upper],
+        )
+        cursor.execute(
+            f"ALTER TABLE {TABLE} ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)",
+            [lower, upper],
+        )
+    return name
+
+
+def ensure_result_partitions(ahead: int, now: datetime = None) -> list:
+    """Create the partitions of the current month and of the `ahead` next ones.
+
+    Args:
+        ahead (int): Number of months after the current one to prepare
+        now (datetime): Reference date, defaults to now (optional)
+
+    Returns:
+        list: Names of the partitions created.
+    """
+    current = month_start(now or timezone.now())
+    existing = result_partitions()
+    created = []
+    for offset in range(ahead + 1):
+        month = add_months(current, offset)
+        if month not in existing:
+            created.append(create_result_partition(month))
+    return created
+
+
+def prune_result_partitions(
+    retain: int, detach: bool = False, now: datetime = None
+) -> list:
+    """Drop, or only detach, the partitions of the months past retention.
+
+    Whole partitions go at once, without any DELETE or vacuum debt. Results of
+    a config all share its crawl date, its creation date, so a partition is
+    only pruned once none of the configs created that month is still in use:
+    scheduled for re-crawls, or crawled within the retention. Every config of
+    a pruned month loses all its results: their summaries are zeroed and
+    their cached responses invalidated.
+
+    Args:
+        retain (int): Number of months kept, the current one included
+        detach (bool): Keep the partitions as standalone tables (optional)
+        now (datetime): Reference date, defaults to now (optional)
+
+    Returns:
+        list: Names of the partitions dropped or detached.
+    """
+    cutoff = add_months(month_start(now or timezone.now()), 1 - retain)
+    pruned = []
+    for month, name in sorted(result_partitions().items()):
+        if month >= cutoff:
+            break
+        upper = add_months(month, 1)
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT EXISTS (SELECT 1 FROM crawler_googlesearchconfig "
+                "WHERE created_at >= %s AND created_at < %s "
+                "AND (recrawl_interval IS NOT NULL OR last_crawled_at >= %s))",
+                [month, upper, cutoff],
+            )
+            if cursor.fetchone()[0]:
+                logger.info(f"Keeping partition {name}, its configs are still crawled")
+                continue
+            cursor.execute(f"ALTER TABLE {TABLE} DETACH PARTITION {name}")
+            if not detach:
+                cursor.execute(f"DROP TABLE {name}")
+            cursor.execute(
+                "UPDATE crawler_googlesearchresultsummary AS summary "
+                "SET result_count = 0, domain_count = 0, latest_crawled_at = NULL, "
+                "updated_at = now() FROM crawler_googlesearchconfig AS config "
+                "WHERE summary.config_id = config.id "
+                "AND config.created_at >= %s AND config.created_at < %s "
+                "RETURNING summary.config_id",
+                [month, upper],
+            )
+            invalidate_configs(
+                *(config_id for config_id, in cursor.fetchall()), cascade=True
+            )
+        logger.info(f"{'Detached' if detach else 'Dropped'} partition {name}")
+        pruned.append(name)
+    return pruned
@@ -0,0 +1,92 @@
+from django.conf import settings
+
+
+def plan_pages(results: int, start: int = 0, max_num: int = None) -> list:
+    """Split a result count into the fewest page requests.
+
+    Args:
+        results (int): Number of results wanted
+        start (int): Offset of the first result (optional)
+        max_num (int): Most results a single request can return, defaults to
+            CRAWLER_SERP_MAX_NUM (optional)
+
+    Returns:
+        list: (start, num) of every request, in offset order.
+    """
+    max_num = max_num or settings.CRAWLER_SERP_MAX_NUM
+    return [
+        (offset, min(max_num, start + results - offset))
+        for offset in range(start, start + results, max_num)
+    ]
+
+
+class PaginationPlanner:
+    """Decide which page to request next while results are being collected.
+
+    Each request asks for as many results as are still missing, up to
+    `max_num`. The next request starts right after the last result actually
+    returned, rather than after the number asked for, so short pages never
+    leave gaps and never overlap. Collection stops once the target is
+    reached, a page brings nothing new, or more than `max_duplicate_ratio`
+    of the results were already seen on `patience` pages in a row.
+
+    Args:
+        target (int): Number of results wanted
+        start (int): Offset of the first result (optional)
+        max_num (int): Most results a single request can return (optional)
+        max_duplicate_ratio (float): Share of already seen results above which
+            a page counts as wasted (optional)
+        patience (int): Wasted pages in a row tolerated before stopping (optional)
+    """
+
+    def __init__(
+        self,
+        target: int,
+        start: int = 0,
+        max_num: int = None,
+        max_duplicate_ratio: float = None,
+        patience: int = 1,
+    ):
+        self.target = target
+        self.start = start
+        self.max_num = max_num or settings.CRAWLER_SERP_MAX_NUM
+        self.max_duplicate_ratio = (
+            settings.CRAWLER_SERP_MAX_DUPLICATE_RATIO
+            if max_duplicate_ratio is None
+            else max_duplicate_ratio
+        )
+        self.patience = patience
+        self.collected = 0
+        self.requests = 0
+        self.wasted = 0
+        self.stop_reason = None
+
+    def next_request(self):
+        """Return the (start, num) of the next request, or None when done."""
+        if self.stop_reason is None and self.collected >= self.target:
+            self.stop_reason = "target"
+        if self.stop_reason is not None:
+            return None
+        return self.start, min(self.max_num, self.target - self.collected)
+
+    def record(self, returned: int, kept: int, new: int = None):
+        """Account for the page just fetched.
+
+        Args:
+            returned (int): Results the page held
+            kept (int): Results of the page counted towards the target
+            new (int): Results of the page not seen before, defaults to `kept` (optional)
+        """
+        new = kept if new is None else new
+        self.requests += 1
+        self.start += returned
+        self.collected += kept
+        if returned == 0 or kept == 0:
+            self.stop_reason = "exhausted"
+            return
+        if 1 - new / returned > self.max_duplicate_ratio:
+            self.wasted += 1
+            if self.wasted >= self.patience:
+                self.stop_reason = "duplicates"
+        else:
+            self.wasted = 0
@@ -0,0 +1,192 @@
+import json
+import logging
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+from django.db import connections
+
+from config.django.files_and_storage import SegmentArchive, save_text_to_file
+from .models import GoogleSearchResult, SerpSnapshot
+from .parsers import PARSERS, number_results
+from .tasks import GoogleSearch, merge_search_pages
+
+
+logger = logging.getLogger(__name__)
+
+# Archive opened once per worker process, so that segments stay memory-mapped
+# across the configs the process handles
+_worker_archive = None
+
+
+def _init_worker(archive_root: str):
+    global _worker_archive
+    _worker_archive = SegmentArchive(Path(archive_root))
+
+
+def parse_snapshots(engine: str, locations: list) -> list:
+    """Parse archived pages in a worker process, without touching the database.
+
+    Args:
+        engine (str): Name of the parser engine
+        locations (list): (start, segment, offset, length) of every page
+
+    Returns:
+        list: Page payloads with start and results, as merge_search_pages expects.
+    """
+    parser = PARSERS[engine]()
+    pages = []
+    for start, segment, offset, length in locations:
+        html = _worker_archive.read(segment, offset, length).decode("utf-8")
+        pages.append(
+            {"start": start, "results": number_results(list(parser.parse(html)), start)}
+        )
+    return pages
+
+
+def snapshot_locations(config) -> list:
+    """Find the archived pages a config's results were parsed from.
+
+    Pages are archived with the config they were fetched for, and a config
+    coalesced into another one reads the pages of that config. For every
+    page offset the latest page is used, so re-crawled configs are re-parsed
+    from the pages their results were last updated from.
+
+    Pages archived before their config was recorded are matched on the search
+    parameters instead, between the config's cache TTL before its creation
+    and its last crawl. Configs without a last crawl have none of them.
+
+    Returns:
+        list: (start, segment, offset, length) of every page found.
+    """
+    offsets = GoogleSearch.page_offsets(config.results)
+    snapshots = list(
+        SerpSnapshot.objects.filter(
+            config_id=config.coalesced_into_id or config.id, start__in=offsets
+        )
+        .order_by("start", "-fetched_at")
+        .values_list("start", "segment", "offset", "length")
+    )
+    if not snapshots and config.last_crawled_at:
+        snapshots = (
+            SerpSnapshot.objects.filter(
+                config__isnull=True,
+                term=config.term[:255],
+                safe=config.safe,
+                lang=config.lang,
+                region=config.region,
+                start__in=offsets,
+                fetched_at__gte=config.created_at
+                - timedelta(seconds=config.get_cache_ttl()),
+                fetched_at__lte=config.last_crawled_at,
+            )
+            .order_by("start", "-fetched_at")
+            .values_list("start", "segment", "offset", "length")
+        )
+    locations = {}
+    for start, *location in snapshots:
+        locations.setdefault(start, (start, *location))
+    return list(locations.values())
+
+
+class Checkpoint:
+    """Id of the last config fully re-parsed, stored as JSON in a file."""
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    def load(self) -> int:
+        if not self.path.exists():
+            return 0
+        return json.loads(self.path.read_text(encoding="utf-8"))["last_config_id"]
+
+    def save(self, config_id: int):
+        # Written aside then renamed over the checkpoint, so an interrupted run
+        # leaves either the previous checkpoint or the new one, never a torn file
+        temp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        save_text_to_file(
+            temp_path, json.dumps({"last_config_id": config_id}), encoding="utf-8"
+        )
+        os.replace(temp_path, self.path)
+
+    def reset(self):
+        self.path.unlink(missing_ok=True)
+
+
+def reparse_archive(
+    configs,
+    archive_root: Path,
+    checkpoint: Checkpoint,
+    engine: str,
+    workers: int = None,
+    checkpoint_every: int = 100,
+    progress=None,
+) -> dict:
+    """Re-parse the archived pages of configs and upsert their results.
+
+    Configs are handled in id order, after the one recorded in the checkpoint.
+    Parsing is spread over a process pool while this process looks pages up
+    and writes results, so the checkpoint only moves past configs whose
+    results are stored.
+
+    Args:
+        configs (QuerySet): GoogleSearchConfig to re-parse
+        archive_root (Path): Directory of the segment archive
+        checkpoint (Checkpoint): Where progress is read from and saved
+        engine (str): Name of the parser engine
+        workers (int): Number of parser processes, defaults to the CPU count (optional)
+        checkpoint_every (int): Configs between two checkpoint saves (optional)
+        progress (callable): Called with the stats after every checkpoint (optional)
+
+    Returns:
+        dict: Number of configs, pages and results processed.
+    """
+    stats = {"configs": 0, "skipped": 0, "pages": 0, "results": 0}
+    configs = configs.filter(id__gt=checkpoint.load()).order_by("id")
+    workers = workers or os.cpu_count()
+    # Forked parsers must not share the database connections of this process:
+    # close them, then make the pool fork every worker before any new query
+    connections.close_all()
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(str(archive_root),),
+    ) as executor:
+        executor.submit(int).result()
+        in_flight = deque()
+        max_in_flight = workers * 4
+        last_id = None
+
+        def drain(until: int):
+            nonlocal last_id
+            while len(in_flight) > until:
+                config, future = in_flight.popleft()
+                pages = future.result() if future else []
+                if pages:
+                    results = merge_search_pages(pages, config.results)
+                    GoogleSearchResult.objects.persist(config.id, results, update=True)
+                    stats["pages"] += len(pages)
+                    stats["results"] += len(results)
+                else:
+                    stats["skipped"] += 1
+                stats["configs"] += 1
+                last_id = config.id
+                if stats["configs"] % checkpoint_every == 0:
+                    checkpoint.save(last_id)
+                    if progress:
+                        progress(stats)
+
+        for config in configs.iterator(chunk_size=checkpoint_every):
+            locations = snapshot_locations(config)
+            future = (
+                executor.submit(parse_snapshots, engine, locations)
+                if locations
+                else None
+            )
+            in_flight.append((config, future))
+            drain(max_in_flight)
+        drain(0)
+        if last_id is not None:
+            checkpoint.save(last_id)
+    return stats
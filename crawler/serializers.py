@@ -1,15 +1,80 @@
 from rest_framework import serializers
 
-from .models import GoogleSearchConfig, GoogleSearchResult
+from .models import (
+    GoogleSearchConfig,
+    GoogleSearchResult,
+    GoogleSearchResultSummary,
+    RankChange,
+)
+
+
+# Largest value of the integer columns crawl requests are stored in
+MAX_INTEGER = 2**31 - 1
+
+
+class CrawlSpecSerializer(serializers.Serializer):
+    """Crawl request of the run_spider endpoints, checked before anything is stored."""
+
+    term = serializers.CharField(max_length=255)
+    results = serializers.IntegerField(min_value=1, max_value=MAX_INTEGER)
+    safe = serializers.CharField(max_length=30)
+    lang = serializers.CharField(max_length=4, allow_blank=True, allow_null=True)
+    region = serializers.CharField(max_length=4, allow_blank=True, allow_null=True)
+    cache_ttl = serializers.IntegerField(
+        min_value=0, max_value=MAX_INTEGER, allow_null=True, default=None
+    )
+    # Seconds between two re-crawls, none by default
+    recrawl_interval = serializers.IntegerField(
+        min_value=1, max_value=MAX_INTEGER, allow_null=True, default=None
+    )
+    # Null falls back to CRAWLER_STREAM_RESULTS
+    stream = serializers.BooleanField(allow_null=True, default=None)
+
+
+class GoogleSearchResultSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = GoogleSearchResultSummary
+        fields = ("result_count", "domain_count", "latest_crawled_at")
 
 
 class GoogleSearchConfigSerializer(serializers.ModelSerializer):
+    # Null until the first results of the config are stored
+    summary = GoogleSearchResultSummarySerializer(read_only=True)
+
     class Meta:
         model = GoogleSearchConfig
         fields = "__all__"
+        read_only_fields = (
+            "batch",
+            "status",
+            "coalesced_into",
+            "next_crawl_at",
+            "last_crawled_at",
+        )
 
 
 class GoogleSearchResultSerializer(serializers.ModelSerializer):
     class Meta:
         model = GoogleSearchResult
-        fields = "__all__"
+        exclude = ("search_vector",)
+        # Set from the config on insert, it decides the partition of the result
+        read_only_fields = ("crawled_at",)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if self.instance is not None:
+            # Moving a stored result to another config would leave it in the
+            # partition of its former config, out of reach of for_config
+            fields["config"].read_only = True
+        return fields
+
+
+class GoogleSearchResultMatchSerializer(GoogleSearchResultSerializer):
+    rank = serializers.FloatField(read_only=True)
+    headline = serializers.CharField(read_only=True)
+
+
+class RankChangeSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = RankChange
+        exclude = ("config",)
@@ -1,19 +1,46 @@
 import logging
-from bs4 import BeautifulSoup
-from time import sleep
-from urllib.parse import unquote
-from celery import shared_task
-from fake_useragent import UserAgent
+import time
+from celery import chain, chord, shared_task
+from celery.signals import task_postrun, worker_process_shutdown, worker_shutdown
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
 
+from config.django.cache import ResponseCache
+from config.django.claimcheck import ClaimCheckStore
+from config.django.metrics import metrics
+from config.django.ratelimit import RateLimitExceeded, TokenBucket
+from config.django.redis_client import get_redis_client
 from config.django.rest import RestAdapter
-from .models import GoogleSearchConfig, GoogleSearchResult
+from config.django.singleflight import SingleFlight
+from .archive import snapshots as archive_snapshots
+from .models import GoogleSearchConfig, GoogleSearchResult, RankSeries
+from .parsers import get_parser, number_results
+from .planner import PaginationPlanner, plan_pages
+from .useragents import user_agents
+from .utils import crawl_fingerprint, link_hash
+
+
+logger = logging.getLogger(__name__)
+
+parse_duration = metrics.histogram(
+    "crawler_parse_duration_seconds", "Seconds spent parsing a result page, by engine."
+)
+results_per_page = metrics.histogram(
+    "crawler_results_per_page",
+    "Results parsed from each fetched page, a spike at 0 means the markup changed.",
+    buckets=(0, 1, 2, 5, 8, 10, 20, 50, 100),
+)
 
 
 class GoogleSearch:
-    def __init__(self, proxy=None, logger=None):
-        ua = UserAgent()
+    search_url = "https://www.google.com/search"
+    page_size = 10
+
+    def __init__(self, proxy=None, logger=None, parser=None, snapshots=None):
         headers = {
-            "User-Agent": ua.chrome,
+            "User-Agent": user_agents.next(),
             "Accept": "*/*",
         }
         proxies = (
@@ -26,88 +53,572 @@ class GoogleSearch:
             )
             else None
         )
-        self.rest = RestAdapter(headers=headers, proxies=proxies, logger=logger)
+        cache = ResponseCache(
+            get_redis_client(),
+            prefix="serpcache",
+            max_entries=settings.CRAWLER_CACHE_MAX_ENTRIES,
+        )
+        self.rest = RestAdapter(
+            headers=headers,
+            proxies=proxies,
+            logger=logger,
+            cache=cache,
+            session_profile="google",
+            pool_connections=settings.CRAWLER_HTTP_POOL_CONNECTIONS,
+            pool_maxsize=settings.CRAWLER_HTTP_POOL_MAXSIZE,
+            max_retries=settings.CRAWLER_HTTP_MAX_RETRIES,
+            backoff_factor=settings.CRAWLER_HTTP_BACKOFF_FACTOR,
+            backoff_max=settings.CRAWLER_HTTP_BACKOFF_MAX,
+        )
+        self.limiter = TokenBucket.for_egress(
+            get_redis_client(),
+            proxy if proxies else None,
+            rate=settings.CRAWLER_RATE_LIMIT_PER_MINUTE / 60,
+            capacity=settings.CRAWLER_RATE_LIMIT_BURST,
+        )
+        self.parser = get_parser(parser)
+        if snapshots is None and settings.CRAWLER_ARCHIVE_DIR:
+            snapshots = archive_snapshots
+        self.snapshots = snapshots
         self.logger = logger or logging.getLogger(__name__)
 
-    def _request(
+    def _params(
         self, term: str, results: int, lang: str, start: int, safe: str, region: str
-    ):
-        params = {
+    ) -> dict:
+        return {
             "q": term,
-            "num": results + 2,
+            "num": results,
             "hl": lang,
             "start": start,
             "safe": safe,
             "gl": region,
         }
+
+    def _request(
+        self,
+        term: str,
+        results: int,
+        lang: str,
+        start: int,
+        safe: str,
+        region: str,
+        cache_ttl: int = None,
+        on_miss=None,
+    ):
+        params = self._params(term, results, lang, start, safe, region)
         cookies = {
             "CONSENT": "PENDING+987",
             "SOCS": "CAESHAgBEhIaAB",
         }
         return self.rest.get(
-            "https://www.google.com/search", params=params, cookies=cookies, timeout=5
+            self.search_url,
+            params=params,
+            cookies=cookies,
+            timeout=5,
+            cache_ttl=cache_ttl,
+            on_miss=on_miss,
         )
 
     def _parse_results(self, response):
-        soup = BeautifulSoup(response, "html.parser")
-        result_block = soup.find_all("div", class_="ezO2md")
-        for result in result_block:
-            link_tag = result.find("a", href=True)
-            title_tag = link_tag.find("span", class_="CVA68e") if link_tag else None
-            description_tag = result.find("span", class_="FrIlee")
-
-            if link_tag and title_tag and description_tag:
-                link = unquote(link_tag["href"].split("&")[0].replace("/url?q=", ""))
-                title = title_tag.text if title_tag else ""
-                description = description_tag.text if description_tag else ""
-                yield {"link": link, "title": title, "description": description}
-
-    def search(self, term, results, safe, start, lang, region, unique=False):
-        fetched_results = 0
-        fetched_links = set()
-
-        while fetched_results < results:
-            response_text = self._request(term, results, safe, start, lang, region)
+        return self.parser.parse(response)
+
+    @classmethod
+    def page_offsets(cls, results: int, start: int = 0) -> list:
+        """Return the `start` offset of every page needed to collect `results` results."""
+        return [offset for offset, _ in plan_pages(results, start)]
+
+    def fetch_page(
+        self, term, safe, start, lang, region, cache_ttl=None, num=None, config_id=None
+    ) -> dict:
+        """Fetch and parse a single result page of `num` results (page_size by default).
+
+        Pages cached within `cache_ttl` seconds are served without a network
+        round-trip and without taking a rate limiter token. Pages are archived
+        for `config_id` whether or not they come from the cache, cached ones
+        only add an index row pointing at the content already archived.
+
+        Returns:
+            dict: The page offset, whether the page was fetched, its parsed
+            results and fetch/parse timings.
+
+        Raises:
+            RateLimitExceeded: If no token is available for this egress.
+        """
+        num = num or self.page_size
+        fetch_started = time.perf_counter()
+        # A single cache lookup, a token is taken on every miss before fetching
+        response_text = self._request(
+            term,
+            num,
+            lang,
+            start,
+            safe,
+            region,
+            cache_ttl=cache_ttl,
+            on_miss=self.limiter.consume,
+        )
+        if response_text and self.snapshots is not None:
+            self.snapshots.record(
+                response_text, term, start, safe, lang, region, config_id
+            )
+        parse_started = time.perf_counter()
+        results = (
+            number_results(list(self._parse_results(response_text)), start)
+            if response_text
+            else []
+        )
+        if response_text:
+            parse_duration.observe(
+                time.perf_counter() - parse_started, engine=self.parser.name
+            )
+            results_per_page.observe(len(results))
+        return {
+            "start": start,
+            # False when the request failed, as opposed to a page without results
+            "fetched": bool(response_text),
+            "results": results,
+            "fetch_seconds": parse_started - fetch_started,
+            "parse_seconds": time.perf_counter() - parse_started,
+        }
+
+    def search(
+        self, term, results, safe, start, lang, region, unique=False, fetched_links=None
+    ):
+        """Yield parsed results page by page until enough results were fetched.
+
+        Pages are planned by PaginationPlanner: each request asks for every
+        missing result at once and starts after the last result received, and
+        the search stops early once pages only repeat what was already seen.
+
+        A token is taken from the shared rate limiter before every page. When none
+        is available RateLimitExceeded is raised with the offset to resume from,
+        so the caller can reschedule instead of blocking.
+        """
+        fetched_links = set(fetched_links or ())
+        planner = PaginationPlanner(results, start)
+
+        while (request := planner.next_request()) is not None:
+            start, num = request
+            try:
+                self.limiter.consume()
+            except RateLimitExceeded as exc:
+                exc.start = start
+                raise
+            response_text = self._request(term, num, lang, start, safe, region)
             if not response_text:
                 break  # Stop the search if the request fails
 
-            new_results = 0
-            for search_result in self._parse_results(response_text):
-                if search_result.link in fetched_links and unique:
+            page = number_results(list(self._parse_results(response_text)), start)
+            kept_results = new_results = 0
+            for search_result in page:
+                seen = search_result["link"] in fetched_links
+                if seen and unique:
                     continue  # Skip this result if the link is not unique
 
-                fetched_links.add(search_result.link)
-                fetched_results += 1
-                new_results += 1
+                fetched_links.add(search_result["link"])
+                kept_results += 1
+                new_results += not seen
                 yield search_result
 
-                if fetched_results >= results:
+                if planner.collected + kept_results >= results:
                     return  # Stop if we have fetched the desired number of results
+            planner.record(len(page), kept_results, new_results)
 
-            if new_results == 0:
-                logging.info(
-                    f"Only {fetched_results} results found for query requiring {results} results."
-                )
-                break  # Break the loop if no new results were found in this iteration
+        if planner.stop_reason != "target":
+            self.logger.info(
+                f"Only {planner.collected} results found for query requiring "
+                f"{results} results after {planner.requests} requests "
+                f"({planner.stop_reason or 'failed request'})."
+            )
 
-            start += 10
-            sleep(120)  # Avoid hitting Google's rate limits
 
+@task_postrun.connect
+def flush_metrics(**kwargs):
+    metrics.flush()
 
-@shared_task
-def google_search_task(term, results, safe, start, lang, region, unique=False):
-    goog = GoogleSearch()
-    return list(goog.search(term, results, safe, start, lang, region, unique))
 
+@task_postrun.connect
+def flush_snapshots(**kwargs):
+    if settings.CRAWLER_ARCHIVE_DIR:
+        archive_snapshots.flush(force=False)
 
-@shared_task
-def process_search_results_task(results, config_id):
+
+@worker_shutdown.connect
+@worker_process_shutdown.connect
+def flush_snapshots_on_shutdown(**kwargs):
+    if settings.CRAWLER_ARCHIVE_DIR:
+        archive_snapshots.flush()
+
+
+def crawl_flights() -> SingleFlight:
+    """Return the flights electing one crawl per set of identical parameters."""
+    return SingleFlight(
+        get_redis_client(), ttl=settings.CRAWLER_COALESCE_WINDOW, prefix="crawlflight"
+    )
+
+
+def claim_checks() -> ClaimCheckStore:
+    """Return the store page payloads are passed through between tasks."""
+    return ClaimCheckStore(
+        get_redis_client(),
+        ttl=settings.CLAIM_CHECK_TTL,
+        threshold=settings.CLAIM_CHECK_THRESHOLD,
+    )
+
+
+def start_crawl(config, stream=None) -> int:
+    """Enqueue the fetch, parse and persist tasks of a search config.
+
+    When an identical crawl is already running, and CRAWLER_COALESCE_WINDOW is
+    set, nothing is enqueued: the config is attached to that crawl and gets a
+    copy of its results once it completes.
+
+    A link is stored once per config whatever the number of pages it appears
+    on, see GoogleSearchResult.
+
+    Args:
+        config (GoogleSearchConfig): Config to crawl
+        stream (bool): Persist pages as they are parsed, defaults to
+            CRAWLER_STREAM_RESULTS (optional)
+
+    Returns:
+        int: Id of the config whose crawl fetches the results.
+    """
+    if stream is None:
+        stream = settings.CRAWLER_STREAM_RESULTS
+    fingerprint = ""
+    if settings.CRAWLER_COALESCE_WINDOW:
+        fingerprint = crawl_fingerprint(
+            config.term,
+            config.results,
+            config.safe,
+            config.lang,
+            config.region,
+        )
+        leader_id = int(crawl_flights().claim(fingerprint, str(config.id)))
+        if leader_id != config.id:
+            attach_crawl(config.id, leader_id)
+            return leader_id
+
+    GoogleSearchConfig.objects.filter(id=config.id).update(
+        status=GoogleSearchConfig.Status.RUNNING, fingerprint=fingerprint
+    )
+    pages = plan_pages(config.results)
+    cache_ttl = config.get_cache_ttl()
+    # Called when a page or the callback fails, the chord callback never runs then
+    on_error = fail_crawl_task.s(config.id)
+    if stream:
+        # Store each page as soon as it is parsed, only metadata reaches the callback
+        chord(
+            chain(
+                google_search_page_task.s(
+                    config.term,
+                    config.safe,
+                    start,
+                    config.lang,
+                    config.region,
+                    cache_ttl,
+                    num,
+                    config.id,
+                ).set(ignore_result=True),
+                persist_search_page_task.s(config.id, config.results),
+            )
+            for start, num in pages
+        )(finalize_search_task.s(config.id).on_error(on_error))
+    else:
+        # Fetch every result page in parallel, then merge and store them in the callback
+        chord(
+            google_search_page_task.s(
+                config.term,
+                config.safe,
+                start,
+                config.lang,
+                config.region,
+                cache_ttl,
+                num,
+                config.id,
+            )
+            for start, num in pages
+        )(process_search_results_task.s(config.id).on_error(on_error))
+    return config.id
+
+
+def attach_crawl(config_id, leader_id):
+    """Make a config wait for the results of the identical crawl of another."""
+    GoogleSearchConfig.objects.filter(id=config_id).update(
+        status=GoogleSearchConfig.Status.RUNNING, coalesced_into_id=leader_id
+    )
+    # The leader may have completed or failed before the link above was stored
+    leader_status = GoogleSearchConfig.objects.values_list("status", flat=True).get(
+        id=leader_id
+    )
+    if leader_status == GoogleSearchConfig.Status.COMPLETED:
+        copy_crawl_results(leader_id, config_id)
+    elif leader_status == GoogleSearchConfig.Status.FAILED:
+        GoogleSearchConfig.objects.filter(id=config_id).update(
+            status=GoogleSearchConfig.Status.FAILED
+        )
+
+
+def copy_crawl_results(leader_id, config_id):
+    leader = GoogleSearchConfig.objects.get(id=leader_id)
+    GoogleSearchResult.objects.for_config(leader).copy_to(config_id)
+    GoogleSearchConfig.objects.filter(id=config_id).update(
+        status=GoogleSearchConfig.Status.COMPLETED
+    )
+
+
+def observe_ranks(config, positions):
+    """Append the positions of a crawl, by link, to the rank history of its query."""
+    RankSeries.objects.observe(
+        config.term, config.lang, config.region, positions, depth=config.results
+    )
+
+
+def complete_crawl(config_id):
+    """Mark a crawl completed and hand its results to the configs attached to it."""
     config = GoogleSearchConfig.objects.get(id=config_id)
-    for result in results:
-        GoogleSearchResult.objects.create(
-            config=config,
-            link=result["link"],
-            title=result["title"],
-            description=result["description"],
+    observe_ranks(
+        config,
+        dict(
+            GoogleSearchResult.objects.for_config(config)
+            .filter(position__isnull=False)
+            .values_list("link", "position")
+        ),
+    )
+    if config.fingerprint:
+        crawl_flights().release(config.fingerprint, str(config.id))
+    GoogleSearchConfig.objects.filter(id=config_id).update(
+        status=GoogleSearchConfig.Status.COMPLETED, last_crawled_at=timezone.now()
+    )
+    followers = config.coalesced.filter(status=GoogleSearchConfig.Status.RUNNING)
+    for follower_id in followers.values_list("id", flat=True):
+        copy_crawl_results(config_id, follower_id)
+
+
+def fail_crawl(config_id):
+    """Mark a crawl failed, along with the configs attached to it, and end its flight.
+
+    The leader is marked first, so that a config attaching concurrently either
+    is among the followers updated here or finds the leader failed.
+    """
+    config = GoogleSearchConfig.objects.get(id=config_id)
+    GoogleSearchConfig.objects.filter(id=config_id).update(
+        status=GoogleSearchConfig.Status.FAILED
+    )
+    if config.fingerprint:
+        crawl_flights().release(config.fingerprint, str(config.id))
+    config.coalesced.filter(status=GoogleSearchConfig.Status.RUNNING).update(
+        status=GoogleSearchConfig.Status.FAILED
+    )
+
+
+def start_recrawl(config):
+    """Enqueue a fresh crawl of a config whose changes are stored by record_recrawl_task.
+
+    Pages are never served from the response cache, and the crawl is never
+    coalesced, since the point is to see the current result page.
+    """
+    GoogleSearchConfig.objects.filter(id=config.id).update(
+        status=GoogleSearchConfig.Status.RUNNING
+    )
+    chord(
+        google_search_page_task.s(
+            config.term,
+            config.safe,
+            start,
+            config.lang,
+            config.region,
+            0,
+            num,
+            config.id,
+        )
+        for start, num in plan_pages(config.results)
+    )(record_recrawl_task.s(config.id).on_error(fail_crawl_task.s(config.id)))
+
+
+@shared_task(ignore_result=True)
+def start_crawl_task(config_id, stream=None):
+    start_crawl(GoogleSearchConfig.objects.get(id=config_id), stream)
+
+
+@shared_task(ignore_result=True)
+def fail_crawl_task(request, exc, traceback, config_id):
+    """Errback of the crawl chords, releases the configs waiting on a failed crawl."""
+    logger.error(f"Crawl of config {config_id} failed: {exc!r}")
+    fail_crawl(config_id)
+
+
+@shared_task(ignore_result=True)
+def schedule_recrawls_task():
+    """Enqueue the re-crawl of the configs whose interval has elapsed, run by beat.
+
+    Due configs are claimed by moving their next crawl date one interval ahead,
+    with rows locked by another scheduler run skipped, so a config is never
+    enqueued twice for the same slot. Configs still being crawled are left
+    due and picked up by the first run after their crawl ends.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        due = list(
+            GoogleSearchConfig.objects.filter(
+                recrawl_interval__isnull=False, next_crawl_at__lte=now
+            )
+            .exclude(status=GoogleSearchConfig.Status.RUNNING)
+            .order_by("next_crawl_at")
+            .select_for_update(skip_locked=True)
+            .values_list("id", flat=True)[: settings.CRAWLER_RECRAWL_BATCH_SIZE]
+        )
+        GoogleSearchConfig.objects.filter(id__in=due).update(
+            next_crawl_at=now + F("recrawl_interval")
+        )
+    if due:
+        logger.info(f"Scheduling {len(due)} re-crawls")
+        recrawl_task.chunks(
+            ((config_id,) for config_id in due), settings.CRAWLER_BATCH_CHUNK_SIZE
+        ).group().apply_async()
+
+
+@shared_task(ignore_result=True)
+def recrawl_task(config_id):
+    start_recrawl(GoogleSearchConfig.objects.get(id=config_id))
+
+
+@shared_task(bind=True, max_retries=None)
+def google_search_task(
+    self, term, results, safe, start, lang, region, unique=False, collected=None
+):
+    collected = collected or []
+    goog = GoogleSearch()
+    try:
+        for search_result in goog.search(
+            term,
+            results - len(collected),
+            safe,
+            start,
+            lang,
+            region,
+            unique,
+            fetched_links=[result["link"] for result in collected],
+        ):
+            collected.append(search_result)
+    except RateLimitExceeded as exc:
+        # Give the worker back and resume from the page that was not fetched yet
+        raise self.retry(
+            args=(term, results, safe, exc.start, lang, region, unique, collected),
+            countdown=exc.retry_after,
+        )
+    return collected
+
+
+@shared_task(bind=True, max_retries=None)
+def google_search_page_task(
+    self, term, safe, start, lang, region, cache_ttl=None, num=None, config_id=None
+):
+    goog = GoogleSearch()
+    try:
+        page = goog.fetch_page(
+            term, safe, start, lang, region, cache_ttl, num, config_id
         )
+        # Large pages travel by reference, the next task reads them from Redis
+        return claim_checks().put(page)
+    except RateLimitExceeded as exc:
+        raise self.retry(countdown=exc.retry_after)
+
+
+def merge_search_pages(pages, limit):
+    """Merge page payloads in offset order into a single list of results.
+
+    A link is only kept the first time it appears, whatever page it comes
+    from, as links are stored once per config.
+    """
+    merged = []
+    seen = set()
+    for page in sorted(pages, key=lambda page: page["start"]):
+        for result in page["results"]:
+            key = link_hash(result["link"])
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.append(result)
+            if len(merged) >= limit:
+                return merged
+    return merged
+
+
+@shared_task(ignore_result=True)
+def process_search_results_task(pages, config_id):
+    config = GoogleSearchConfig.objects.get(id=config_id)
+    store = claim_checks()
+    results = merge_search_pages([store.get(page) for page in pages], config.results)
+    GoogleSearchResult.objects.persist(config.id, results)
+    store.discard(*pages)
+    complete_crawl(config_id)
     return {"status": "completed", "config_id": config_id}
+
+
+@shared_task(ignore_result=True)
+def record_recrawl_task(pages, config_id):
+    """Store the changes of a re-crawled result page since the previous crawl.
+
+    Nothing is recorded unless every page was fetched: the links of a missing
+    page would read as dropped, and links that moved to it as well.
+    """
+    config = GoogleSearchConfig.objects.get(id=config_id)
+    store = claim_checks()
+    payloads = [store.get(page) for page in pages]
+    failed = [page["start"] for page in payloads if not page.get("fetched", True)]
+    results = [] if failed else merge_search_pages(payloads, config.results)
+    if results:
+        changes = GoogleSearchResult.objects.record_snapshot(config.id, results)
+        observe_ranks(
+            config, {result["link"]: result["position"] for result in results}
+        )
+        logger.info(f"Re-crawl of config {config.id}: {len(changes)} changes")
+    elif failed:
+        logger.warning(
+            f"Re-crawl of config {config.id} could not fetch the pages starting "
+            f"at {failed}, nothing recorded"
+        )
+    else:
+        # A blocked fetch must not read as every link being dropped
+        logger.warning(
+            f"Re-crawl of config {config.id} returned no result, nothing recorded"
+        )
+    store.discard(*pages)
+    GoogleSearchConfig.objects.filter(id=config_id).update(
+        status=GoogleSearchConfig.Status.COMPLETED,
+        last_crawled_at=timezone.now() if results else F("last_crawled_at"),
+    )
+
+
+@shared_task
+def persist_search_page_task(page, config_id, limit):
+    """Store one fetched page and return its metadata instead of the results."""
+    persist_started = time.perf_counter()
+    store = claim_checks()
+    reference, page = page, store.get(page)
+    results = page["results"][: max(0, limit - page["start"])]
+    GoogleSearchResult.objects.persist(config_id, results)
+    store.discard(reference)
+    return {
+        "start": page["start"],
+        "count": len(results),
+        "fetch_seconds": page["fetch_seconds"],
+        "parse_seconds": page["parse_seconds"],
+        "persist_seconds": time.perf_counter() - persist_started,
+    }
+
+
+@shared_task(ignore_result=True)
+def finalize_search_task(page_stats, config_id):
+    complete_crawl(config_id)
+    return {
+        "status": "completed",
+        "config_id": config_id,
+        "pages": len(page_stats),
+        "results": sum(stats["count"] for stats in page_stats),
+        "fetch_seconds": sum(stats["fetch_seconds"] for stats in page_stats),
+        "parse_seconds": sum(stats["parse_seconds"] for stats in page_stats),
+        "persist_seconds": sum(stats["persist_seconds"] for stats in page_stats),
+    }
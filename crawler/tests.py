@@ -1,3 +1,439 @@
-from django.test import TestCase
+import json
+import math
+from datetime import datetime, timedelta, timezone
 
-# Create your tests here.
+import numpy as np
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework.exceptions import NotFound
+
+from config.django.claimcheck import ClaimCheckExpired, ClaimCheckStore
+from .analytics import RankHistory, rank_report, trend
+from .benchmarks import FIXTURE_DIR, FixtureRestAdapter, UnlimitedBucket, load_corpus
+from .models import OBSERVATION, OFF_PAGE, GoogleSearchResult
+from .pagination import CrawledAtCursorPagination
+from .parsers import PARSERS, SoupSerpParser
+from .planner import PaginationPlanner, plan_pages
+from .serializers import CrawlSpecSerializer
+from .tasks import GoogleSearch, merge_search_pages
+
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+CRAWL_SPEC = {
+    "term": "echo chamber",
+    "results": 10,
+    "safe": "off",
+    "lang": "en",
+    "region": None,
+}
+
+
+def serp_page(links: list) -> str:
+    """Return a minimal result page holding one result block per link."""
+    blocks = "".join(
+        f'<div class="ezO2md"><a href="/url?q={link}&amp;sa=U">'
+        f'<span class="CVA68e">{link}</span></a>'
+        f'<span class="FrIlee">About {link}</span></div>'
+        for link in links
+    )
+    return f'<html><body><div id="main">{blocks}</div></body></html>'
+
+
+def packed(*observations) -> bytes:
+    """Pack (day offset from START, position) pairs as a RankSeries blob."""
+    return b"".join(
+        OBSERVATION.pack(int((START + timedelta(days=day)).timestamp()), position)
+        for day, position in observations
+    )
+
+
+class SerpParserParityTests(SimpleTestCase):
+    """Every parser engine must yield what the reference soup engine yields."""
+
+    def test_engines_match_reference_on_fixture_corpus(self):
+        corpus = load_corpus(FIXTURE_DIR)
+        self.assertTrue(corpus, f"No SERP fixture found in {FIXTURE_DIR}")
+        reference = SoupSerpParser()
+        for name, engine in PARSERS.items():
+            parser = engine()
+            for page, html in corpus.items():
+                with self.subTest(engine=name, page=page):
+                    self.assertEqual(
+                        list(parser.parse(html)), list(reference.parse(html))
+                    )
+
+
+class RecordingRestAdapter(FixtureRestAdapter):
+    """Fixture adapter that also records the (start, num) of every request."""
+
+    def __init__(self, pages):
+        super().__init__(pages)
+        self.params = []
+
+    def get(self, endpoint, params=None, on_miss=None, **kwargs):
+        self.params.append((params["start"], params["num"]))
+        return super().get(endpoint, params, on_miss, **kwargs)
+
+
+class PaginationPlannerTests(SimpleTestCase):
+    def test_plan_pages_splits_into_fewest_requests(self):
+        self.assertEqual(
+            plan_pages(250, max_num=100), [(0, 100), (100, 100), (200, 50)]
+        )
+        self.assertEqual(
+            plan_pages(25, start=10, max_num=10), [(10, 10), (20, 10), (30, 5)]
+        )
+        self.assertEqual(plan_pages(0), [])
+
+    def test_next_request_starts_after_the_last_result_returned(self):
+        planner = PaginationPlanner(25, max_num=100)
+        self.assertEqual(planner.next_request(), (0, 25))
+        planner.record(returned=8, kept=8)
+        self.assertEqual(planner.next_request(), (8, 17))
+        planner.record(returned=17, kept=17)
+        self.assertIsNone(planner.next_request())
+        self.assertEqual(planner.stop_reason, "target")
+        self.assertEqual(planner.requests, 2)
+
+    def test_stops_on_an_empty_page(self):
+        planner = PaginationPlanner(25, max_num=10)
+        planner.next_request()
+        planner.record(returned=0, kept=0)
+        self.assertIsNone(planner.next_request())
+        self.assertEqual(planner.stop_reason, "exhausted")
+
+    def test_stops_after_patience_pages_of_duplicates(self):
+        planner = PaginationPlanner(
+            100, max_num=10, max_duplicate_ratio=0.5, patience=2
+        )
+        planner.record(returned=10, kept=10, new=2)
+        self.assertIsNotNone(planner.next_request())
+        planner.record(returned=10, kept=10, new=10)
+        planner.record(returned=10, kept=10, new=1)
+        self.assertIsNotNone(planner.next_request())
+        planner.record(returned=10, kept=10, new=0)
+        self.assertIsNone(planner.next_request())
+        self.assertEqual(planner.stop_reason, "duplicates")
+
+    @override_settings(CRAWLER_SERP_MAX_NUM=10)
+    def test_search_requests_exactly_the_planned_number_of_results(self):
+        goog = GoogleSearch()
+        goog.limiter = UnlimitedBucket()
+        goog.rest = RecordingRestAdapter(
+            [
+                serp_page(
+                    [f"https://example.com/{page}/{index}" for index in range(10)]
+                )
+                for page in range(3)
+            ]
+        )
+        results = list(goog.search("echo chamber", 25, "off", 0, "en", "us"))
+        self.assertEqual(goog.rest.params, [(0, 10), (10, 10), (20, 5)])
+        self.assertEqual(len(results), 25)
+        self.assertEqual([result["position"] for result in results], list(range(1, 26)))
+
+    def test_fetch_page_requests_the_given_number_of_results(self):
+        goog = GoogleSearch()
+        goog.limiter = UnlimitedBucket()
+        goog.rest = RecordingRestAdapter([serp_page(["https://example.com/a"])])
+        page = goog.fetch_page("echo chamber", "off", 30, "en", "us", num=7)
+        self.assertEqual(goog.rest.params, [(30, 7)])
+        self.assertTrue(page["fetched"])
+        self.assertEqual(page["results"][0]["position"], 31)
+
+
+class MergeSearchPagesTests(SimpleTestCase):
+    @staticmethod
+    def page(start, *links):
+        return {"start": start, "results": [{"link": link} for link in links]}
+
+    def test_merges_pages_in_offset_order(self):
+        pages = [
+            self.page(2, "https://c.com", "https://d.com"),
+            self.page(0, "https://a.com", "https://b.com"),
+        ]
+        self.assertEqual(
+            [result["link"] for result in merge_search_pages(pages, 10)],
+            ["https://a.com", "https://b.com", "https://c.com", "https://d.com"],
+        )
+
+    def test_keeps_the_first_occurrence_of_equivalent_links(self):
+        pages = [
+            self.page(0, "https://a.com/x", "https://b.com"),
+            self.page(2, "HTTPS://A.com/x/#top", "https://c.com"),
+        ]
+        self.assertEqual(
+            [result["link"] for result in merge_search_pages(pages, 10)],
+            ["https://a.com/x", "https://b.com", "https://c.com"],
+        )
+
+    def test_stops_at_the_limit(self):
+        pages = [
+            self.page(0, "https://a.com", "https://b.com"),
+            self.page(2, "https://c.com"),
+        ]
+        self.assertEqual(
+            [result["link"] for result in merge_search_pages(pages, 2)],
+            ["https://a.com", "https://b.com"],
+        )
+        self.assertEqual(merge_search_pages([], 10), [])
+
+
+class MemoryRedis:
+    """Dict backed stand-in for the few Redis commands ClaimCheckStore uses."""
+
+    def __init__(self):
+        self.data = {}
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+
+class ClaimCheckStoreTests(SimpleTestCase):
+    def setUp(self):
+        self.redis = MemoryRedis()
+        self.store = ClaimCheckStore(self.redis, ttl=60, threshold=64)
+
+    def test_small_payloads_pass_through(self):
+        payload = {"start": 0, "results": []}
+        self.assertIs(self.store.put(payload), payload)
+        self.assertIs(self.store.get(payload), payload)
+        self.assertEqual(self.redis.data, {})
+
+    def test_large_payloads_travel_by_reference(self):
+        payload = {
+            "start": 0,
+            "results": [{"link": f"https://example.com/{i}"} for i in range(10)],
+        }
+        reference = self.store.put(payload)
+        self.assertTrue(ClaimCheckStore.is_reference(reference))
+        self.assertEqual(self.store.get(reference), payload)
+        self.store.discard(reference, payload)
+        self.assertEqual(self.redis.data, {})
+        with self.assertRaises(ClaimCheckExpired):
+            self.store.get(reference)
+
+
+class RankSeriesRows:
+    """Stand-in for a RankSeries queryset, as read by RankHistory.from_queryset."""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def values_list(self, *fields):
+        return self
+
+    def iterator(self, chunk_size=None):
+        return iter(self.rows)
+
+
+class RankAnalyticsTests(SimpleTestCase):
+    def assertPositions(self, row, expected):
+        self.assertEqual(
+            [None if math.isnan(value) else value for value in row], expected
+        )
+
+    def test_daily_holds_each_position_until_the_next_observation(self):
+        history = RankHistory(
+            [("https://a.com", "en", "us")],
+            [packed((-3, 7), (0.5, 3), (2.1, 9), (2.9, 5), (6, 1))],
+        )
+        matrix = history.daily(START, 5)
+        self.assertEqual(matrix.shape, (1, 5))
+        # Day 0 ends on the observation of that day, not the one before start,
+        # the last observation of day 2 wins and day 6 is past the window
+        self.assertPositions(matrix[0], [3, 3, 5, 5, 5])
+
+    def test_daily_is_nan_before_the_first_observation(self):
+        history = RankHistory(
+            [("https://a.com", "en", "us"), ("https://b.com", "en", "us")],
+            [packed((2, 4)), b""],
+        )
+        matrix = history.daily(START, 4)
+        self.assertPositions(matrix[0], [None, None, 4, 4])
+        self.assertPositions(matrix[1], [None, None, None, None])
+
+    def test_daily_reads_off_page_observations_as_nan(self):
+        history = RankHistory(
+            [("https://a.com", "en", "us"), ("https://b.com", "en", "us")],
+            [
+                packed((0, 3), (2, OFF_PAGE), (3, 4)),
+                packed((-5, 2), (-1, OFF_PAGE)),
+            ],
+        )
+        matrix = history.daily(START, 5)
+        self.assertPositions(matrix[0], [3, 3, None, 4, 4])
+        # Off the page since before the window, never a position of 0
+        self.assertPositions(matrix[1], [None] * 5)
+
+    def test_trend_is_the_least_squares_slope_of_observed_days(self):
+        slopes = trend(
+            np.array(
+                [[1, 2, 3, 4], [np.nan, 4, 3, np.nan], [np.nan] * 4, [5, 5, 5, 5]],
+                dtype=np.float32,
+            )
+        )
+        self.assertAlmostEqual(slopes[0], 1)
+        self.assertAlmostEqual(slopes[1], -1)
+        self.assertTrue(math.isnan(slopes[2]))
+        self.assertAlmostEqual(slopes[3], 0)
+
+    def test_rank_report_ranks_links_and_lists_movers(self):
+        rows = [
+            ("https://up.com", "en", "us", packed((0, 8), (3, 2))),
+            ("https://down.com", "en", "us", packed((0, 1), (3, 6))),
+            ("https://flat.com", "en", "us", packed((0, 4))),
+            ("https://old.com", "en", "us", packed((-30, 3))),
+        ]
+        report = rank_report(
+            RankSeriesRows(rows),
+            START + timedelta(days=4),
+            4,
+            top=10,
+            link="https://up.com",
+        )
+        self.assertEqual((report["series"], report["observations"]), (4, 6))
+        self.assertEqual(
+            [entry["link"] for entry in report["ranking"]],
+            [
+                "https://up.com",
+                "https://old.com",
+                "https://flat.com",
+                "https://down.com",
+            ],
+        )
+        (up,) = report["top_movers"]["up"]
+        self.assertEqual((up["link"], up["change"]), ("https://up.com", 6))
+        self.assertEqual((up["start_position"], up["end_position"]), (8, 2))
+        self.assertEqual(up["days_on_page"], 4)
+        (down,) = report["top_movers"]["down"]
+        self.assertEqual((down["link"], down["change"]), ("https://down.com", -5))
+        (history,) = report["history"]
+        self.assertEqual([day["position"] for day in history["daily"]], [8, 8, 8, 2])
+        self.assertEqual(history["daily"][0]["date"], START.date())
+
+    def test_rank_report_leaves_links_off_the_page_out_of_the_ranking(self):
+        rows = [
+            ("https://gone.com", "en", "us", packed((0, 1), (2, OFF_PAGE))),
+            ("https://kept.com", "en", "us", packed((0, 5))),
+        ]
+        report = rank_report(
+            RankSeriesRows(rows),
+            START + timedelta(days=4),
+            4,
+            top=10,
+            link="https://gone.com",
+        )
+        self.assertEqual(
+            [entry["link"] for entry in report["ranking"]], ["https://kept.com"]
+        )
+        (history,) = report["history"]
+        self.assertEqual(
+            [day["position"] for day in history["daily"]], [1, 1, None, None]
+        )
+        self.assertIsNone(history["position"])
+        self.assertEqual((history["end_position"], history["days_on_page"]), (1, 2))
+
+    def test_rank_report_of_no_series_is_empty(self):
+        report = rank_report(RankSeriesRows([]), START, 7, top=10)
+        self.assertEqual(report["series"], 0)
+        self.assertEqual(report["ranking"], [])
+        self.assertEqual(report["top_movers"], {"up": [], "down": []})
+
+
+class CrawlSpecValidationTests(SimpleTestCase):
+    def test_valid_spec_gets_defaults(self):
+        serializer = CrawlSpecSerializer(data=CRAWL_SPEC)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertIsNone(serializer.validated_data["cache_ttl"])
+        self.assertIsNone(serializer.validated_data["recrawl_interval"])
+        self.assertIsNone(serializer.validated_data["stream"])
+
+    def test_invalid_fields_are_reported(self):
+        serializer = CrawlSpecSerializer(
+            data={
+                "term": "x" * 256,
+                "results": 0,
+                "cache_ttl": -1,
+                "recrawl_interval": 0,
+                "stream": "sometimes",
+            }
+        )
+        self.assertFalse(serializer.is_valid())
+        self.assertEqual(
+            set(serializer.errors),
+            {
+                "term",
+                "results",
+                "safe",
+                "lang",
+                "region",
+                "cache_ttl",
+                "recrawl_interval",
+                "stream",
+            },
+        )
+        self.assertEqual(serializer.errors["safe"][0].code, "required")
+        self.assertEqual(serializer.errors["results"][0].code, "min_value")
+
+    def post_batch(self, body):
+        return self.client.post(
+            reverse("run_spider_batch"), body, content_type="application/json"
+        )
+
+    def test_batch_rejects_malformed_bodies(self):
+        self.assertEqual(self.post_batch("{").status_code, 400)
+        response = self.post_batch(json.dumps([CRAWL_SPEC]))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("crawls", response.json()["error"])
+
+    def test_batch_lists_errors_by_index(self):
+        response = self.post_batch(
+            json.dumps(
+                {"crawls": [CRAWL_SPEC, {**CRAWL_SPEC, "results": 0}, CRAWL_SPEC, {}]}
+            )
+        )
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()["errors"]
+        self.assertEqual(set(errors), {"1", "3"})
+        self.assertIn("results", errors["1"])
+        self.assertEqual(
+            set(errors["3"]), {"term", "results", "safe", "lang", "region"}
+        )
+
+    def test_batch_rejects_empty_and_oversized_lists(self):
+        response = self.post_batch(json.dumps({"crawls": []}))
+        self.assertEqual(response.status_code, 400)
+        with self.settings(CRAWLER_BATCH_MAX_SIZE=2):
+            response = self.post_batch(json.dumps({"crawls": [CRAWL_SPEC] * 3}))
+        self.assertEqual(response.status_code, 400)
+
+
+class KeysetCursorPaginationTests(SimpleTestCase):
+    def test_position_holds_every_ordering_field(self):
+        paginator = CrawledAtCursorPagination()
+        result = GoogleSearchResult(id=42, crawled_at=START)
+        position = paginator._get_position_from_instance(result, paginator.ordering)
+        self.assertEqual(json.loads(position), [str(START), "42"])
+
+    def test_seeks_past_the_whole_position(self):
+        paginator = CrawledAtCursorPagination()
+        queryset = paginator._seek(
+            GoogleSearchResult.objects.all(), json.dumps([str(START), "42"]), True
+        )
+        where = str(queryset.query).split("WHERE")[1]
+        self.assertIn('("crawler_googlesearchresult"."crawled_at", ', where)
+        self.assertIn('"crawler_googlesearchresult"."id") < (', where)
+
+    def test_rejects_malformed_positions(self):
+        paginator = CrawledAtCursorPagination()
+        for position in ("garbage", json.dumps(["42"]), json.dumps(["now", "42"])):
+            with self.subTest(position=position), self.assertRaises(NotFound):
+                paginator._seek(GoogleSearchResult.objects.all(), position, True)
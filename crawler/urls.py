@@ -1,7 +1,14 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
-from .views import CrawlView, GoogleSearchConfigViewSet, GoogleSearchResultViewSet
+from .views import (
+    CrawlBatchView,
+    CrawlView,
+    GoogleSearchConfigViewSet,
+    GoogleSearchResultViewSet,
+    MetricsView,
+    RankAnalyticsView,
+)
 
 
 router = DefaultRouter()
@@ -11,4 +18,8 @@ router.register(r'result', GoogleSearchResultViewSet)
 urlpatterns = [
     path('', include(router.urls)),
     path('run_spider/', CrawlView.as_view(), name='run_spider'),
+    path('run_spider/batch/', CrawlBatchView.as_view(), name='run_spider_batch'),
+    path('run_spider/batch/<int:pk>/', CrawlBatchView.as_view(), name='run_spider_batch_detail'),
+    path('metrics', MetricsView.as_view(), name='metrics'),
+    path('analytics/ranks/', RankAnalyticsView.as_view(), name='rank_analytics'),
 ]
\ No newline at end of file
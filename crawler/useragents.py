@@ -0,0 +1,42 @@
+import itertools
+import threading
+from django.conf import settings
+
+
+class UserAgentPool:
+    """Rotating pool of browser user agents, sampled once per process.
+
+    Loading the fake_useragent dataset is the slow part of building a
+    UserAgent, so it is only done the first time an agent is needed, and a
+    fixed sample is then handed out in turn.
+
+    Args:
+        size (int): Number of user agents sampled, defaults to
+            CRAWLER_USER_AGENT_POOL_SIZE (optional)
+        browsers (tuple): Browsers the user agents are sampled from (optional)
+    """
+
+    def __init__(self, size: int = None, browsers=("Chrome",)):
+        self.size = size
+        self.browsers = browsers
+        self._agents = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        from fake_useragent import UserAgent
+
+        user_agent = UserAgent(browsers=list(self.browsers))
+        size = self.size or settings.CRAWLER_USER_AGENT_POOL_SIZE
+        # Duplicates are dropped, the dataset may hold fewer agents than asked
+        agents = list(dict.fromkeys(user_agent.random for _ in range(size)))
+        return itertools.cycle(agents)
+
+    def next(self) -> str:
+        """Return the next user agent of the pool."""
+        with self._lock:
+            if self._agents is None:
+                self._agents = self._load()
+            return next(self._agents)
+
+
+user_agents = UserAgentPool()
@@ -0,0 +1,49 @@
+import hashlib
+from urllib.parse import urlsplit, urlunsplit
+
+
+def normalize_link(link: str) -> str:
+    """Normalize a result link so that equivalent URLs compare equal.
+
+    The scheme and host are lower-cased, the fragment is dropped and a trailing
+    slash is removed from the path.
+    """
+    parts = urlsplit(link.strip())
+    return urlunsplit(
+        (
+            parts.scheme.lower(),
+            parts.netloc.lower(),
+            parts.path.rstrip("/"),
+            parts.query,
+            "",
+        )
+    )
+
+
+def link_hash(link: str) -> str:
+    """Return the SHA-256 hex digest of the normalized link."""
+    return hashlib.sha256(normalize_link(link).encode("utf-8")).hexdigest()
+
+
+def link_domain(link: str) -> str:
+    """Return the lower-cased host name of a link, without port or "www." prefix."""
+    host = (urlsplit(link.strip()).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def crawl_fingerprint(
+    term: str, results: int, safe: str, lang: str, region: str
+) -> str:
+    """Return a digest identifying crawls that would fetch the same results.
+
+    The term is lower-cased with its whitespace collapsed, and the other
+    parameters are lower-cased, so that trivially different requests match.
+    """
+    parts = (
+        " ".join(term.split()).lower(),
+        str(results),
+        (safe or "").lower(),
+        (lang or "").lower(),
+        (region or "").lower(),
+    )
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
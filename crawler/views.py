@@ -1,43 +1,294 @@
 import json
-from django.http import JsonResponse, HttpResponseBadRequest
+from datetime import timedelta
+from django.conf import settings
+from django.http import (
+    HttpResponse,
+    JsonResponse,
+    HttpResponseBadRequest,
+    StreamingHttpResponse,
+)
+from django.db import transaction
+from django.utils import timezone
 from django.views import View
 from rest_framework import viewsets
-from celery import chord
+from rest_framework.decorators import action
+from rest_framework.response import Response
 
-from .models import GoogleSearchConfig, GoogleSearchResult
-from .serializers import GoogleSearchConfigSerializer, GoogleSearchResultSerializer
-from crawler.tasks import google_search_task, process_search_results_task
+from config.django.metrics import metrics
+from .caching import CachedResponseMixin
+from .exports import CONTENT_TYPES, RENDERERS, export_rows
+from .filters import GoogleSearchConfigFilter, GoogleSearchResultFilter
+from .models import CrawlBatch, GoogleSearchConfig, GoogleSearchResult, RankSeries
+from .pagination import (
+    CrawledAtCursorPagination,
+    CreatedAtCursorPagination,
+    DetectedAtCursorPagination,
+)
+from .serializers import (
+    CrawlSpecSerializer,
+    GoogleSearchConfigSerializer,
+    GoogleSearchResultMatchSerializer,
+    GoogleSearchResultSerializer,
+    RankChangeSerializer,
+)
+from crawler.tasks import start_crawl, start_crawl_task
+
+
+def crawl_spec(values: dict):
+    """Turn a crawl request validated by CrawlSpecSerializer into crawl arguments.
+
+    Args:
+        values (dict): Validated data of the request
+
+    Returns:
+        tuple: GoogleSearchConfig field values and stream flag.
+    """
+    recrawl_interval = values["recrawl_interval"] and timedelta(
+        seconds=values["recrawl_interval"]
+    )
+    fields = {
+        "term": values["term"],
+        "results": values["results"],
+        "safe": values["safe"],
+        "lang": values["lang"],
+        "region": values["region"],
+        "cache_ttl": values["cache_ttl"],
+        "recrawl_interval": recrawl_interval,
+        # Set here too since bulk_create skips GoogleSearchConfig.save
+        "next_crawl_at": recrawl_interval and timezone.now() + recrawl_interval,
+    }
+    stream = values["stream"]
+    if stream is None:
+        stream = settings.CRAWLER_STREAM_RESULTS
+    return fields, stream
 
 
 class CrawlView(View):
     def post(self, request, *args, **kwargs):
         try:
             data = json.loads(request.body)
-            term = data["term"]
-            results = data["results"]
-            safe = data["safe"]
-            lang = data["lang"]
-            region = data["region"]
-        except (json.JSONDecodeError, TypeError, ValueError) as e:
+        except json.JSONDecodeError as e:
+            return HttpResponseBadRequest(f"Invalid JSON data: {e}")
+        serializer = CrawlSpecSerializer(data=data)
+        if not serializer.is_valid():
+            return JsonResponse(
+                {"error": "Invalid crawl request.", "errors": serializer.errors},
+                status=400,
+            )
+
+        fields, stream = crawl_spec(serializer.validated_data)
+        config = GoogleSearchConfig.objects.create(**fields)
+        leader_id = start_crawl(config, stream)
+
+        return JsonResponse(
+            {
+                "status": "success",
+                "config_id": config.id,
+                "coalesced_into": None if leader_id == config.id else leader_id,
+            }
+        )
+
+
+class CrawlBatchView(View):
+    def post(self, request, *args, **kwargs):
+        """Create and enqueue many crawls at once from {"crawls": [spec, ...]}.
+
+        Nothing is stored unless every spec is valid, the 400 response lists
+        the errors of the invalid ones by index.
+        """
+        try:
+            data = json.loads(request.body)
+        except json.JSONDecodeError as e:
             return HttpResponseBadRequest(f"Invalid JSON data: {e}")
+        if not isinstance(data, dict) or "crawls" not in data:
+            return JsonResponse(
+                {"error": 'Expected a JSON object {"crawls": [spec, ...]}.'},
+                status=400,
+            )
+        serializer = CrawlSpecSerializer(
+            data=data["crawls"],
+            many=True,
+            allow_empty=False,
+            max_length=settings.CRAWLER_BATCH_MAX_SIZE,
+        )
+        if not serializer.is_valid():
+            errors = serializer.errors
+            if isinstance(errors, list):
+                # One entry per spec, empty for the valid ones
+                errors = {index: error for index, error in enumerate(errors) if error}
+            return JsonResponse(
+                {"error": "Invalid crawl requests.", "errors": errors}, status=400
+            )
+        specs = [crawl_spec(values) for values in serializer.validated_data]
+
+        with transaction.atomic():
+            batch = CrawlBatch.objects.create()
+            configs = GoogleSearchConfig.objects.bulk_create(
+                (GoogleSearchConfig(batch=batch, **fields) for fields, _ in specs),
+                batch_size=settings.CRAWLER_PERSIST_BATCH_SIZE,
+            )
+
+        # One message per chunk instead of one per crawl
+        start_crawl_task.chunks(
+            ((config.id, stream) for config, (_, stream) in zip(configs, specs)),
+            settings.CRAWLER_BATCH_CHUNK_SIZE,
+        ).group().apply_async()
+
+        return JsonResponse(
+            {"status": "success", "batch_id": batch.id, "configs": len(configs)}
+        )
+
+    def get(self, request, pk, *args, **kwargs):
+        """Return how many configs of the batch are pending, running or completed."""
+        try:
+            batch = CrawlBatch.objects.get(id=pk)
+        except CrawlBatch.DoesNotExist:
+            return JsonResponse({"error": f"Batch {pk} not found"}, status=404)
+        return JsonResponse({"batch_id": batch.id, **batch.progress()})
+
 
-        config = GoogleSearchConfig.objects.create(
-            term=term, results=results, safe=safe, lang=lang, region=region
+class MetricsView(View):
+    def get(self, request, *args, **kwargs):
+        return HttpResponse(
+            metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
         )
 
-        # Create a chord with the google_search_task and a callback to process the results
-        search_chord = chord(
-            google_search_task.s(term, results, safe, 0, lang, region) for _ in range(1)
-        )(process_search_results_task.s(config.id))
 
-        return JsonResponse({"status": "success", "config_id": config.id})
+class RankAnalyticsView(View):
+    def get(self, request, *args, **kwargs):
+        """Rank ranking, top movers and trends of the links of a term.
 
+        `term` is required, `lang` and `region` narrow the query, `days` sets
+        the window (90 by default), `top` the length of the lists, and `link`
+        adds the daily positions of one link.
+        """
+        # Imported here, numpy is only loaded by processes serving analytics
+        from .analytics import rank_report
 
-class GoogleSearchConfigViewSet(viewsets.ModelViewSet):
-    queryset = GoogleSearchConfig.objects.all()
+        term = request.GET.get("term", "").strip()
+        if not term:
+            return JsonResponse(
+                {"error": "The term parameter is required."}, status=400
+            )
+        try:
+            days = int(request.GET.get("days", 90))
+            top = int(request.GET.get("top", 10))
+        except ValueError:
+            return JsonResponse({"error": "days and top must be integers."}, status=400)
+        if not 1 <= days <= settings.ANALYTICS_MAX_DAYS:
+            return JsonResponse(
+                {"error": f"days must be between 1 and {settings.ANALYTICS_MAX_DAYS}."},
+                status=400,
+            )
+        top = max(1, min(top, settings.API_MAX_PAGE_SIZE))
+
+        series = RankSeries.objects.filter(term=term)
+        for field in ("lang", "region"):
+            if field in request.GET:
+                series = series.filter(**{field: request.GET[field]})
+        report = rank_report(
+            series, timezone.now(), days, top, request.GET.get("link") or None
+        )
+        return JsonResponse({"term": term, **report})
+
+
+def export_response(queryset, output: str, filename: str):
+    """Stream a result queryset as NDJSON or CSV without loading it in memory.
+
+    Args:
+        queryset (QuerySet): GoogleSearchResult queryset to export
+        output (str): Either "ndjson" or "csv"
+        filename (str): Name of the downloaded file, without extension
+
+    Returns:
+        HttpResponseBase: Streaming response, or 400 for an unknown output.
+    """
+    if output not in RENDERERS:
+        return HttpResponseBadRequest(
+            f"Unknown output {output!r}, expected one of {', '.join(RENDERERS)}"
+        )
+    rows = export_rows(queryset, settings.CRAWLER_EXPORT_CHUNK_SIZE)
+    response = StreamingHttpResponse(
+        RENDERERS[output](rows), content_type=CONTENT_TYPES[output]
+    )
+    response["Content-Disposition"] = f'attachment; filename="{filename}.{output}"'
+    return response
+
+
+class GoogleSearchConfigViewSet(CachedResponseMixin, viewsets.ModelViewSet):
+    queryset = GoogleSearchConfig.objects.select_related("summary")
     serializer_class = GoogleSearchConfigSerializer
+    pagination_class = CreatedAtCursorPagination
+    filterset_class = GoogleSearchConfigFilter
+
+    def cache_scopes(self, request, **kwargs):
+        return ["configs"]
+
+    @action(detail=True)
+    def export(self, request, pk=None):
+        """Stream every result of the config, `?output=csv` for CSV."""
+        config = self.get_object()
+        return export_response(
+            GoogleSearchResult.objects.for_config(config),
+            request.query_params.get("output", "ndjson"),
+            f"results-{config.id}",
+        )
+
+    @action(detail=True)
+    def changes(self, request, pk=None):
+        """Rank changes detected by the re-crawls of the config, newest first.
+
+        `kind` keeps only new, dropped or moved links.
+        """
+        config = self.get_object()
+        changes = config.rank_changes.all()
+        if request.query_params.get("kind"):
+            changes = changes.filter(kind=request.query_params["kind"])
+        paginator = DetectedAtCursorPagination()
+        page = paginator.paginate_queryset(changes, request, view=self)
+        return paginator.get_paginated_response(
+            RankChangeSerializer(page, many=True).data
+        )
 
 
-class GoogleSearchResultViewSet(viewsets.ModelViewSet):
-    queryset = GoogleSearchResult.objects.all()
+class GoogleSearchResultViewSet(CachedResponseMixin, viewsets.ModelViewSet):
+    queryset = GoogleSearchResult.objects.select_related("config")
     serializer_class = GoogleSearchResultSerializer
+    pagination_class = CrawledAtCursorPagination
+    filterset_class = GoogleSearchResultFilter
+    cached_actions = ("list", "retrieve", "search")
+
+    def cache_scopes(self, request, **kwargs):
+        # Lists of a single config only go stale when that config's results change
+        config_id = request.GET.get("config", "")
+        if "pk" not in kwargs and config_id.isdigit():
+            return [f"results:{int(config_id)}"]
+        return ["results"]
+
+    @action(detail=False)
+    def search(self, request):
+        """Full-text search of titles and descriptions, best matches first.
+
+        `q` takes web search syntax ("exact phrase", or, -excluded). Every result
+        filter applies, and `limit` bounds the number of matches returned.
+        """
+        text = request.query_params.get("q", "").strip()
+        if not text:
+            return Response({"detail": "The q parameter is required."}, status=400)
+        try:
+            limit = int(request.query_params.get("limit", settings.SEARCH_PAGE_SIZE))
+        except ValueError:
+            return Response({"detail": "limit must be an integer."}, status=400)
+        limit = max(1, min(limit, settings.API_MAX_PAGE_SIZE))
+        matches = self.filter_queryset(self.get_queryset()).search(text)[:limit]
+        serializer = GoogleSearchResultMatchSerializer(matches, many=True)
+        return Response({"query": text, "results": serializer.data})
+
+    @action(detail=False)
+    def export(self, request):
+        """Stream the filtered results unpaginated, `?output=csv` for CSV."""
+        return export_response(
+            self.filter_queryset(self.get_queryset()),
+            request.query_params.get("output", "ndjson"),
+            "results",
+        )